@@ -0,0 +1,146 @@
+"""
+Async read views for ASGI deployments, see ``ASYNC_VIEWS``.
+
+They serve the GET actions of ``RecipeViewSet`` and
+``IngredientViewSet`` from the event loop with the viewset's own
+authentication, filtering, pagination and exception handling, so the
+responses are the same. Other methods are passed to the viewset.
+
+Database and cache calls go through ``sync_to_async``, which runs them
+on one shared thread per worker, so those steps of concurrent requests
+are serialized. Only the waiting outside them, such as reading requests
+from slow clients, overlaps, which is why WSGI is the default.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from recipes.models import Ingredient
+from .cache import (get_cached_ingredients, get_ingredients_version,
+                    set_cached_ingredients)
+from .conditional import (get_etag, get_last_modified, get_not_modified,
+                          recipe_states, set_validators)
+from .filters import IngredientFilter
+from .search import get_ingredient_index
+
+
+def async_read(async_view, viewset_view):
+    """
+    Serve GET requests with ``async_view``, called with the viewset of
+    ``viewset_view`` set up for the request, and other methods with
+    ``viewset_view`` itself.
+    """
+    sync_view = sync_to_async(viewset_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await sync_view(request, *args, **kwargs)
+        viewset = get_viewset(viewset_view, request, args, kwargs)
+        try:
+            # Authentication, permissions and throttling, as in dispatch().
+            await sync_to_async(viewset.initial)(viewset.request,
+                                                 *args, **kwargs)
+            response = await async_view(viewset, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(viewset.request, response)
+        if isinstance(response, Response):
+            response.render()
+        return response
+
+    # Names the endpoint in metrics like the viewset does.
+    view.cls = viewset_view.cls
+    view.actions = viewset_view.actions
+    return csrf_exempt(view)
+
+
+def get_viewset(viewset_view, request, args, kwargs):
+    """Instantiate the viewset behind ``viewset_view`` as it does."""
+    viewset = viewset_view.cls(**viewset_view.initkwargs)
+    viewset.action_map = viewset_view.actions
+    viewset.args = args
+    viewset.kwargs = kwargs
+    viewset.request = viewset.initialize_request(request, *args, **kwargs)
+    viewset.headers = viewset.default_response_headers
+    return viewset
+
+
+def get_page_states(viewset):
+    """States of the filtered recipes on the requested page."""
+    return viewset.paginate_queryset(recipe_states(
+        viewset.filter_queryset(viewset.get_queryset()),
+        viewset.request.user))
+
+
+async def recipe_list(viewset):
+    """Async ``RecipeViewSet.list``."""
+    request = viewset.request
+    states = await sync_to_async(get_page_states)(viewset)
+    etag = get_etag(states, viewset.get_page_meta())
+    not_modified = get_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = viewset.get_paginated_response(
+        await sync_to_async(viewset.get_recipes_data)(states))
+    set_validators(request, response, etag)
+    return response
+
+
+async def recipe_detail(viewset, pk):
+    """Async ``RecipeViewSet.retrieve``."""
+    request = viewset.request
+    state = await sync_to_async(get_object_or_404)(
+        recipe_states(viewset.get_queryset(), request.user), pk=pk)
+
+    etag = get_etag([state])
+    last_modified = (None if request.user.is_authenticated
+                     else get_last_modified(state))
+    not_modified = get_not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    data = await sync_to_async(viewset.get_recipes_data)([state])
+    if not data:
+        raise Http404
+    response = Response(data[0])
+    set_validators(request, response, etag, last_modified)
+    return response
+
+
+async def ingredient_list(viewset):
+    """Async ``IngredientViewSet.list``."""
+    request = viewset.request
+    version = await sync_to_async(get_ingredients_version)()
+    etag = f'"{version}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match == '*' or etag in parse_etags(if_none_match):
+        return Response(status=status.HTTP_304_NOT_MODIFIED,
+                        headers={'ETag': etag})
+
+    name = request.query_params.get('name', '')
+    limit = viewset.get_limit()
+    data = await sync_to_async(get_cached_ingredients)(version, name, limit)
+    if data is None:
+        data = await search_ingredients(name, limit)
+        await sync_to_async(set_cached_ingredients)(version, name, limit,
+                                                    data)
+    return Response(data, headers={'ETag': etag})
+
+
+async def search_ingredients(name, limit):
+    """Async counterpart of ``IngredientViewSet.search``."""
+    if settings.INGREDIENTS_SEARCH_INDEX:
+        # Builds the index in a thread when the catalogue has changed.
+        index = await sync_to_async(get_ingredient_index)()
+        return index.search(name, limit)
+    queryset = IngredientFilter({'name': name},
+                                queryset=Ingredient.objects.all()).qs
+    return [
+        ingredient async for ingredient in
+        queryset[:limit].values('id', 'name', 'measurement_unit')
+    ]
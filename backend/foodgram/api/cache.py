@@ -0,0 +1,92 @@
+"""
+Versioned caches of serialized ingredients and recipes.
+
+Every cached entry embeds a version in its key, so invalidation only has
+to change the version; stale entries are never read again and expire on
+their own. The ingredient catalogue has a single version kept in the
+cache, a recipe is versioned by its own and its author's ``updated_at``.
+The ingredient lists of all recipes share another version, which
+in-process indexes built from them are checked against.
+
+Versions are stored without a timeout and only change when invalidated,
+so ETags derived from them stay valid and cached entries stay in use.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from metrics import record_cache
+
+INGREDIENTS_VERSION_KEY = 'ingredients:version'
+RECIPE_INGREDIENTS_VERSION_KEY = 'recipe_ingredients:version'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_ingredients_version():
+    """Return the current catalogue version, creating it if missing."""
+    return _get_version(INGREDIENTS_VERSION_KEY)
+
+
+def invalidate_ingredients():
+    """Drop every cached catalogue entry by moving to a new version."""
+    cache.set(INGREDIENTS_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_recipe_ingredients_version():
+    """Return the version of the ingredient lists of all recipes."""
+    return _get_version(RECIPE_INGREDIENTS_VERSION_KEY)
+
+
+def invalidate_recipe_ingredients():
+    """Mark ingredient lists as changed, see ``api.coverage``."""
+    cache.set(RECIPE_INGREDIENTS_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_cached_ingredients(version, name, limit=None):
+    data = cache.get(_ingredients_key(version, name, limit))
+    record_cache('ingredients', data is not None, data is None)
+    return data
+
+
+def set_cached_ingredients(version, name, limit, data):
+    cache.set(_ingredients_key(version, name, limit), data,
+              timeout=settings.INGREDIENTS_CACHE_TIMEOUT)
+
+
+def _ingredients_key(version, name, limit):
+    # Names are hashed to keep keys short and valid for memcached-like
+    # backends; the search is case-insensitive, so is the key.
+    digest = hashlib.md5(name.lower().encode()).hexdigest()
+    return f'ingredients:{version}:{digest}:{limit}'
+
+
+def get_cached_recipes(keys):
+    """Return ``{key: data}`` for the recipes found in the cache."""
+    found = cache.get_many(keys)
+    record_cache('recipes', len(found), len(keys) - len(found))
+    return found
+
+
+def set_cached_recipes(data_by_key):
+    cache.set_many(data_by_key, timeout=settings.RECIPES_CACHE_TIMEOUT)
+
+
+def recipe_key(state, base_url):
+    """
+    Key of a recipe without user-specific fields.
+
+    ``base_url`` is part of the key because image links are absolute.
+    """
+    digest = hashlib.md5(base_url.encode()).hexdigest()[:8]
+    return (f'recipe:{state["id"]}:{state["updated_at"].timestamp()}:'
+            f'{state["author_updated_at"].timestamp()}:{digest}')
@@ -0,0 +1,103 @@
+"""
+Conditional GET support for recipes.
+
+A recipe's representation depends on the recipe and its ingredients
+(``Recipe.updated_at``), on its author's profile (``User.updated_at``)
+and on whether the requesting user has favorited it, put it in the
+shopping cart or follows the author. Validators are built from exactly
+these values, so a client copy is reused only while all of them hold.
+"""
+import hashlib
+
+from django.db.models import Exists, F, OuterRef, Value
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import Recipe
+from users.models import Follow
+
+STATE_FIELDS = ('id', 'updated_at', 'author_id', 'author_updated_at',
+                'author_is_subscribed', 'is_favorited', 'is_in_shopping_cart')
+# Values depending on the query rather than the recipe, passed from the
+# state rows to the results when present.
+RESULT_FIELDS = ('search_headline', 'coverage')
+
+
+def recipe_states(queryset, user):
+    """
+    Return state rows of ``queryset`` without loading full recipes.
+
+    ``queryset`` must be annotated like ``RecipeViewSet.get_queryset``.
+    ``pub_date`` is included for cursor pagination, and annotations
+    named in ``RESULT_FIELDS`` when the queryset has them.
+    """
+    extra = ['pub_date'] + [field for field in RESULT_FIELDS
+                            if field in queryset.query.annotations]
+    if user.is_authenticated:
+        is_subscribed = Exists(
+            Follow.objects.filter(user=user, following=OuterRef('author'))
+        )
+    else:
+        is_subscribed = Value(False)
+    return queryset.prefetch_related(None).annotate(
+        author_updated_at=F('author__updated_at'),
+        author_is_subscribed=is_subscribed,
+    ).values(*STATE_FIELDS, *extra)
+
+
+def recipe_state(recipe):
+    """Return the state row of a loaded recipe with its author."""
+    return {
+        'id': recipe.id,
+        'updated_at': recipe.updated_at,
+        'author_id': recipe.author_id,
+        'author_updated_at': recipe.author.updated_at,
+        'author_is_subscribed': recipe.author.is_subscribed,
+        'is_favorited': recipe.is_favorited,
+        'is_in_shopping_cart': recipe.is_in_shopping_cart,
+    }
+
+
+def get_etag(states, extra=None):
+    """Build an ETag from recipe state rows and optional page metadata."""
+    rows = [tuple(state[field] for field in STATE_FIELDS)
+            for state in states]
+    return quote_etag(hashlib.md5(repr((rows, extra)).encode()).hexdigest())
+
+
+def get_last_modified(state):
+    """Return the modification time of a single recipe as a timestamp."""
+    # HTTP dates have a one second resolution.
+    return int(max(state['updated_at'],
+                   state['author_updated_at']).timestamp())
+
+
+def get_not_modified(request, etag, last_modified=None):
+    """Return a 304 (or 412) response if the client copy is still fresh."""
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is not None:
+        set_validators(request, response, etag, last_modified)
+    return response
+
+
+def set_validators(request, response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # The body depends on the user, and the client has to revalidate
+    # instead of guessing freshness from Last-Modified.
+    patch_vary_headers(response, ('Authorization',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, no_cache=True, private=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+
+def touch_ingredient_recipes(ingredient_ids):
+    """Mark recipes using the given ingredients as modified."""
+    Recipe.objects.filter(
+        recipe_ingredients__ingredient_id__in=ingredient_ids
+    ).update(updated_at=timezone.now())
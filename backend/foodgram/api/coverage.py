@@ -0,0 +1,120 @@
+"""
+Ranking of recipes by the share of their ingredients a user has.
+
+The coverage of a recipe is the fraction of its ingredients found in
+the given set. Recipes with at least one of the ingredients are ranked
+by coverage, then by the number of matched ingredients, newer recipes
+first.
+
+Rankings come from one aggregate query over ``RecipeIngredient`` served
+by ``recipe_ingredient_lookup_idx`` or, with ``RECIPE_INGREDIENT_INDEX``
+enabled, from an in-process inverted index rebuilt lazily when the
+recipe ingredients version from ``api.cache`` changes.
+"""
+import heapq
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from recipes.models import RecipeIngredient
+from .cache import get_recipe_ingredients_version
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+class RecipeIngredientIndex:
+    """
+    Recipes of every ingredient with the ingredient count of every
+    recipe.
+
+    Coverage needs the number of matches per recipe, so the recipes of
+    each ingredient are kept as a list and counted rather than as a
+    bitset, whose union would only tell which recipes match at all.
+    """
+
+    def __init__(self, rows):
+        postings = defaultdict(list)
+        self.totals = Counter()
+        for recipe_id, ingredient_id in rows:
+            postings[ingredient_id].append(recipe_id)
+            self.totals[recipe_id] += 1
+        self.postings = {
+            ingredient_id: tuple(recipe_ids)
+            for ingredient_id, recipe_ids in postings.items()
+        }
+
+    def rank(self, ingredient_ids):
+        """Return ranked rows like ``rank_recipes`` does."""
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(self.postings.get(ingredient_id, ()))
+        return Ranking(matched, self.totals)
+
+
+class Ranking:
+    """
+    Recipes ranked by coverage, sorted only as far as a slice needs.
+
+    A page is taken with ``heapq.nlargest`` instead of sorting every
+    matching recipe, which costs most of the time on large catalogues.
+    """
+
+    def __init__(self, matched, totals):
+        self.matched = matched
+        self.totals = totals
+
+    def __len__(self):
+        return len(self.matched)
+
+    def __getitem__(self, index):
+        rows = heapq.nlargest(
+            index.stop if index.stop is not None else len(self),
+            ((count / self.totals[recipe_id], count, recipe_id)
+             for recipe_id, count in self.matched.items())
+        )
+        return [
+            {'recipe': recipe_id, 'matched': count, 'coverage': coverage}
+            for coverage, count, recipe_id in rows[index]
+        ]
+
+
+def get_recipe_ingredient_index():
+    """Return the index for the current recipe ingredients version."""
+    global _index, _index_version
+    version = get_recipe_ingredients_version()
+    if _index_version != version:
+        with _index_lock:
+            if _index_version != version:
+                _index = RecipeIngredientIndex(
+                    RecipeIngredient.objects.values_list(
+                        'recipe_id', 'ingredient_id').iterator(
+                            chunk_size=10000)
+                )
+                _index_version = version
+    return _index
+
+
+def rank_recipes(ingredient_ids):
+    """
+    Return ``{'recipe', 'matched', 'coverage'}`` rows of the recipes
+    containing any of ``ingredient_ids``, best covered first.
+    """
+    if settings.RECIPE_INGREDIENT_INDEX:
+        return get_recipe_ingredient_index().rank(ingredient_ids)
+    matching = RecipeIngredient.objects.filter(
+        ingredient__in=ingredient_ids).values('recipe')
+    return RecipeIngredient.objects.filter(
+        recipe__in=matching
+    ).values('recipe').annotate(
+        matched=Count('id', filter=Q(ingredient__in=ingredient_ids)),
+        total=Count('id'),
+    ).annotate(
+        coverage=Cast('matched', FloatField()) / F('total'),
+    ).values(
+        'recipe', 'matched', 'coverage'
+    ).order_by('-coverage', '-matched', '-recipe')
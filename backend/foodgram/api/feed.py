@@ -0,0 +1,78 @@
+"""
+Feed of the newest recipes from the authors a user follows.
+
+By default the feed is read on request: the newest recipes of every
+followed author are taken from ``recipe_author_pub_date_idx`` and
+merged, so a page costs at most a page of index reads per author however
+many recipes they have published. Users following at least
+``FEED_TIMELINE_MIN_FOLLOWING`` authors get a precomputed timeline
+instead (see ``feed_timeline``), read as a single index range. It is
+built by a background task once a follow reaches the threshold, so
+reading the feed never writes.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from feed_timeline import BUILD_LOCK_SQL, BUILD_SQL
+from recipes.models import FeedTimeline
+
+User = get_user_model()
+
+FANOUT_SQL = """
+    SELECT r.id FROM users_follow f
+    CROSS JOIN LATERAL (
+        SELECT id, pub_date FROM recipes_recipe
+        WHERE author_id = f.following_id {before}
+        ORDER BY pub_date DESC, id DESC LIMIT %s
+    ) r
+    WHERE f.user_id = %s
+    ORDER BY r.pub_date DESC, r.id DESC LIMIT %s
+"""
+
+TIMELINE_SQL = """
+    SELECT recipe_id FROM recipes_feedentry
+    WHERE user_id = %s {before}
+    ORDER BY pub_date DESC, recipe_id DESC LIMIT %s
+"""
+
+
+def feed_recipe_ids(user, limit, before=None):
+    """
+    Subquery of the ids of the ``limit`` newest recipes in the feed of
+    ``user`` published before the ``(pub_date, id)`` position.
+    """
+    if use_timeline(user):
+        condition = 'AND (pub_date, recipe_id) < (%s, %s)' if before else ''
+        return RawSQL(TIMELINE_SQL.format(before=condition),
+                      (user.pk, *(before or ()), limit))
+    condition = 'AND (pub_date, id) < (%s, %s)' if before else ''
+    return RawSQL(FANOUT_SQL.format(before=condition),
+                  (*(before or ()), limit, user.pk, limit))
+
+
+def use_timeline(user):
+    """Whether the feed of ``user`` is read from a timeline."""
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    return bool(threshold and user.following_count >= threshold
+                and FeedTimeline.objects.filter(user=user).exists())
+
+
+def needs_timeline(user_id):
+    """Whether ``user_id`` follows enough authors but has no timeline."""
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    return bool(threshold) and User.objects.filter(
+        pk=user_id, following_count__gte=threshold, feed_timeline=None,
+    ).exists()
+
+
+def build_timeline(user_id):
+    """Create and fill the timeline of ``user_id`` unless it exists."""
+    with transaction.atomic():
+        _, created = FeedTimeline.objects.get_or_create(user_id=user_id)
+        if created:
+            with connection.cursor() as cursor:
+                cursor.execute(BUILD_LOCK_SQL, (user_id, user_id))
+                cursor.execute(BUILD_SQL, (user_id,))
+    return created
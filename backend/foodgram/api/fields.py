@@ -0,0 +1,51 @@
+import base64
+import binascii
+import uuid
+
+from django.core.files.base import ContentFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+
+from constants import IMAGE_MAX_BYTES, IMAGE_MAX_SIDE
+from images import ImageTooLarge, image_name, process_image
+
+
+class ProcessedImageField(Base64ImageField):
+    """
+    Base64 image which is downscaled and re-encoded on upload.
+
+    The data is decoded and opened with Pillow once; oversized uploads
+    are rejected before decoding.
+    """
+
+    TOO_LARGE_MESSAGE = (f'Размер изображения не должен превышать '
+                         f'{IMAGE_MAX_BYTES // (1024 * 1024)} МБ.')
+    TOO_MANY_PIXELS_MESSAGE = 'Слишком большое разрешение изображения.'
+
+    def __init__(self, *args, max_side=IMAGE_MAX_SIDE, **kwargs):
+        self.max_side = max_side
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        data = data.rpartition(';base64,')[2]
+        # Four base64 characters encode three bytes.
+        if len(data) * 3 // 4 > IMAGE_MAX_BYTES + 2:
+            raise ValidationError(self.TOO_LARGE_MESSAGE)
+        try:
+            decoded = base64.b64decode(data)
+        except (binascii.Error, ValueError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if len(decoded) > IMAGE_MAX_BYTES:
+            raise ValidationError(self.TOO_LARGE_MESSAGE)
+
+        try:
+            content = process_image(decoded, self.max_side)
+        except ImageTooLarge:
+            raise ValidationError(self.TOO_MANY_PIXELS_MESSAGE)
+        except (OSError, ValueError, SyntaxError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        return ContentFile(content, name=image_name(uuid.uuid4()))
@@ -1,14 +1,49 @@
+from django import forms
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                           SearchRank)
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Lower, Replace
 from django_filters import rest_framework as filters
 
-from recipes.models import Recipe, Ingredient
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from search_vectors import CONFIG
+
+
+def escape_html(expression):
+    """SQL counterpart of ``django.utils.html.escape`` for ``&<>``."""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')):
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+INGREDIENTS_MATCH_CHOICES = (
+    ('all', 'Все продукты'),
+    ('any', 'Любой из продуктов'),
+)
+
+
+class NumberInFilter(filters.BaseInFilter, filters.Filter):
+    """Comma-separated integers; other values fail validation."""
+
+    field_class = forms.IntegerField
 
 
 class RecipeFilter(filters.FilterSet):
     """Special filter set for recipes."""
 
-    is_favorited = filters.Filter(field_name='is_favorited')
-    is_in_shopping_cart = filters.Filter(field_name='is_in_shopping_cart')
+    is_favorited = filters.BooleanFilter(field_name='favorites',
+                                         method='filter_user_recipes')
+    is_in_shopping_cart = filters.BooleanFilter(
+        field_name='shopping_cart', method='filter_user_recipes')
     author = filters.Filter(field_name='author__id')
+    search = filters.CharFilter(method='filter_search')
+    cooking_time_min = filters.NumberFilter(field_name='cooking_time',
+                                            lookup_expr='gte')
+    cooking_time_max = filters.NumberFilter(field_name='cooking_time',
+                                            lookup_expr='lte')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    ingredients_match = filters.ChoiceFilter(
+        choices=INGREDIENTS_MATCH_CHOICES, method='filter_ingredients_match')
 
     class Meta:
         model = Recipe
@@ -16,15 +51,87 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'author',
+            'search',
+            'cooking_time_min',
+            'cooking_time_max',
+            'ingredients',
+            'ingredients_match',
         ]
 
+    def filter_user_recipes(self, queryset, name, value):
+        """
+        Recipes in (or not in) the user's favorites or shopping cart.
+
+        The inclusion is a join starting from the user's rows in the
+        ``(user_id, recipe_id)`` unique index, so only these recipes are
+        read; the exclusion is an anti-join on the same index.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        lookup = {f'{name}__user': user}
+        if value:
+            return queryset.filter(**lookup)
+        return queryset.exclude(**lookup)
+
+    def filter_ingredients(self, queryset, name, value):
+        """
+        Recipes with all (``ingredients_match=all``, the default) or any
+        (``any``) of the comma-separated ingredient ids.
+
+        Both look the ids up in ``recipe_ingredient_lookup_idx``.
+        """
+        ids = set(value)
+        matching = RecipeIngredient.objects.filter(ingredient__in=ids)
+        if self.form.cleaned_data.get('ingredients_match') != 'any':
+            matching = matching.values('recipe').annotate(
+                matched=Count('id')).filter(matched=len(ids))
+        return queryset.filter(id__in=matching.values('recipe'))
+
+    def filter_ingredients_match(self, queryset, name, value):
+        # Read by ``filter_ingredients``.
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """
+        Full-text search over ``Recipe.search_vector``, most relevant
+        first.
+
+        The query uses web search syntax (quotes, ``or``, ``-``).
+        ``search_headline`` is an HTML-escaped fragment of the
+        description with the matches wrapped in ``<b>``.
+        """
+        query = SearchQuery(value, config=CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                escape_html(F('text')), query, config=CONFIG,
+                max_words=30, min_words=10, max_fragments=2,
+            ),
+        ).order_by('-search_rank', '-pub_date', '-id')
+
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith',
-    )
+    """
+    Prefix search by name, exact matches first.
+
+    Compares ``lower(name)`` so PostgreSQL can use the
+    ``ingredient_name_lower_idx`` pattern index.
+    """
+
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+    def filter_name(self, queryset, name, value):
+        value = value.lower()
+        return queryset.annotate(
+            name_lower=Lower('name')
+        ).filter(
+            name_lower__startswith=value
+        ).order_by(
+            Case(When(name_lower=value, then=Value(0)), default=Value(1)),
+            'name_lower',
+        )
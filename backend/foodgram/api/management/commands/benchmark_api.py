@@ -0,0 +1,266 @@
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.cache import invalidate_ingredients, invalidate_recipe_ingredients
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingList)
+from users.models import Follow, User
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic dataset after the run."""
+
+
+class Command(BaseCommand):
+    help = ('Замеряет количество SQL-запросов, время и пиковую память '
+            'для эндпоинтов API на синтетических данных и сравнивает '
+            'их с бюджетом')
+
+    BUDGET_FILE = os.path.join(settings.BASE_DIR, 'data', 'api_budget.json')
+    USERNAME_PREFIX = 'bench_user_'
+
+    # name, url template; ``{recipe}``, ``{user}`` and ``{last_page}``
+    # are filled in from the seeded dataset.
+    ENDPOINTS = (
+        ('users-list', '/api/users/'),
+        ('users-detail', '/api/users/{user}/'),
+        ('users-me', '/api/users/me/'),
+        ('subscriptions', '/api/users/subscriptions/'),
+        ('subscriptions-limited',
+         '/api/users/subscriptions/?recipes_limit=3'),
+        ('recipes-list', '/api/recipes/'),
+        ('recipes-list-deep', '/api/recipes/?page={last_page}&limit=20'),
+        ('recipes-list-cursor', '/api/recipes/?pagination=cursor&limit=20'),
+        ('recipes-list-favorited', '/api/recipes/?is_favorited=1'),
+        ('recipes-list-cart', '/api/recipes/?is_in_shopping_cart=1'),
+        ('recipes-list-author', '/api/recipes/?author={user}'),
+        ('recipes-feed', '/api/recipes/feed/'),
+        ('recipes-what-to-cook',
+         '/api/recipes/what_to_cook/?ingredients={ingredients}'),
+        ('recipes-detail', '/api/recipes/{recipe}/'),
+        ('recipes-get-link', '/api/recipes/{recipe}/get-link/'),
+        ('short-link', '/recipes/{recipe}/'),
+        ('shopping-cart-download', '/api/recipes/download_shopping_cart/'),
+        ('ingredients-list', '/api/ingredients/'),
+        ('ingredients-search', '/api/ingredients/?name=bench'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows', type=int, default=50,
+                            help='Подписок у пользователя, от имени '
+                                 'которого выполняются запросы')
+        parser.add_argument('--favorites', type=int, default=200)
+        parser.add_argument('--cart', type=int, default=100,
+                            help='Рецептов в списке покупок')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Повторов каждого запроса для замера '
+                                 'времени (берётся медиана)')
+        parser.add_argument('--budget', default=self.BUDGET_FILE)
+        parser.add_argument('--update-budget', action='store_true',
+                            help='Записать текущие замеры в файл бюджета '
+                                 'вместо проверки')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                viewer, ids = self.seed(options)
+                invalidate_ingredients()
+                invalidate_recipe_ingredients()
+                self.stdout.write(
+                    f'Данные созданы за {time.perf_counter() - started:.1f} с.'
+                )
+                with override_settings(ALLOWED_HOSTS=['*']):
+                    results = self.measure(viewer, ids, options['repeat'])
+                raise Rollback
+        except Rollback:
+            invalidate_ingredients()
+            invalidate_recipe_ingredients()
+
+        self.report(results)
+        if options['update_budget']:
+            self.write_budget(options['budget'], results)
+            return
+        self.check_budget(options['budget'], results)
+
+    def seed(self, options):
+        """Create the synthetic dataset and return the requesting user."""
+        users = User.objects.bulk_create(
+            User(
+                username=f'{self.USERNAME_PREFIX}{i}',
+                email=f'{self.USERNAME_PREFIX}{i}@example.com',
+                first_name=f'Имя{i}',
+                last_name=f'Фамилия{i}',
+                password='!',
+            )
+            for i in range(options['users'])
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench ingredient {i}',
+                       measurement_unit=random.choice(('г', 'мл', 'шт.')))
+            for i in range(options['ingredients'])
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=random.choice(users),
+                name=f'Рецепт {i}',
+                image='recipes/bench.jpg',
+                text='Описание рецепта. ' * 20,
+                cooking_time=random.randint(1, 240),
+            )
+            for i in range(options['recipes'])
+        )
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=random.randint(1, 500))
+                for recipe in recipes
+                for ingredient in random.sample(ingredients, per_recipe)
+            ),
+            batch_size=5000,
+        )
+
+        viewer, others = users[0], users[1:]
+        Follow.objects.bulk_create(
+            Follow(user=viewer, following=author)
+            for author in random.sample(others,
+                                        min(options['follows'], len(others)))
+        )
+        Follow.objects.bulk_create(
+            (
+                Follow(user=user, following=random.choice(users[:10]))
+                for user in users[10:]
+            ),
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=viewer, recipe=recipe)
+            for recipe in random.sample(
+                recipes, min(options['favorites'], len(recipes)))
+        )
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=viewer, recipe=recipe)
+            for recipe in random.sample(
+                recipes, min(options['cart'], len(recipes)))
+        )
+        with connection.cursor() as cursor:
+            # Plans must fit the seeded data, as they would on a database
+            # that has been analyzed.
+            cursor.execute('ANALYZE')
+        return viewer, {
+            'user': users[1].pk,
+            'recipe': recipes[0].pk,
+            'last_page': (Recipe.objects.count() - 1) // 20 + 1,
+            'ingredients': ','.join(
+                str(ingredient.pk)
+                for ingredient in random.sample(ingredients,
+                                                min(10, len(ingredients)))
+            ),
+        }
+
+    def measure(self, viewer, ids, repeat):
+        client = APIClient()
+        client.force_authenticate(viewer)
+        results = {}
+        for name, template in self.ENDPOINTS:
+            url = template.format(**ids)
+            # Warm-up request, also used to count queries. The query log
+            # is reset on ``request_started``, so it must start empty.
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(client, url)
+            query_count = len(queries)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name}: {url} вернул {response.status_code}.'
+                )
+
+            timings = []
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                self.request(client, url)
+                timings.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            self.request(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = {
+                'queries': query_count,
+                'time_ms': round(statistics.median(timings) * 1000, 2),
+                'memory_kb': round(peak / 1024, 1),
+            }
+        return results
+
+    @staticmethod
+    def request(client, url):
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"эндпоинт":<28}{"запросов":>10}{"мс":>10}{"КБ":>12}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<28}{result["queries"]:>10}'
+                f'{result["time_ms"]:>10}{result["memory_kb"]:>12}'
+            )
+
+    def write_budget(self, path, results):
+        # Query counts are deterministic; time and memory get headroom
+        # so the budget does not flap between machines.
+        budget = {
+            name: {
+                'queries': result['queries'],
+                'time_ms': round(result['time_ms'] * 3 + 50),
+                'memory_kb': round(result['memory_kb'] * 2 + 256),
+            }
+            for name, result in results.items()
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(budget, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Бюджет записан в {path}.'))
+
+    def check_budget(self, path, results):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                budget = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f'Файл бюджета {path} не найден. '
+                               f'Создайте его с --update-budget.')
+
+        violations = []
+        for name, result in results.items():
+            for metric, limit in budget.get(name, {}).items():
+                if result[metric] > limit:
+                    violations.append(
+                        f'{name}: {metric} = {result[metric]} > {limit}'
+                    )
+        if violations:
+            raise CommandError('Превышен бюджет:\n' + '\n'.join(violations))
+        self.stdout.write(self.style.SUCCESS('Все эндпоинты укладываются '
+                                             'в бюджет.'))
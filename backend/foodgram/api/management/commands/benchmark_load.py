@@ -0,0 +1,106 @@
+import http.client
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест эндпоинтов чтения на запущенных серверах: '
+            'пропускная способность и задержки, например для сравнения '
+            'WSGI и ASGI')
+
+    # name, path; ``{recipe}`` and ``{prefix}`` are taken from the database.
+    ENDPOINTS = (
+        ('recipes-list', '/api/recipes/'),
+        ('recipes-detail', '/api/recipes/{recipe}/'),
+        ('ingredients-search', '/api/ingredients/?name={prefix}'),
+        ('short-link', '/recipes/{recipe}/'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True,
+                            help='Адрес сервера, можно указать несколько '
+                                 'раз, например http://backend:8000')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Количество одновременных запросов')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Количество запросов к каждому эндпоинту')
+        parser.add_argument('--token',
+                            help='Токен пользователя, без него запросы '
+                                 'анонимные')
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or ingredient is None:
+            raise CommandError('Нужен хотя бы один рецепт и продукт.')
+        params = {'recipe': recipe.id, 'prefix': quote(ingredient.name[:2])}
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        self.stdout.write(
+            f'{"эндпоинт":<22}{"сервер":<28}{"запр./с":>9}{"p50 мс":>9}'
+            f'{"p95 мс":>9}{"p99 мс":>9}{"ошибок":>8}'
+        )
+        for name, path in self.ENDPOINTS:
+            path = path.format(**params)
+            for url in options['url']:
+                self.stdout.write(self.format_row(name, url, self.run(
+                    url, path, headers, options['requests'],
+                    options['concurrency'],
+                )))
+        self.stdout.write(
+            'Под ASGI запросы к базе выполняются в одном потоке на воркер, '
+            'поэтому обращения к базе одновременных запросов идут по '
+            'очереди: ASGI выигрывает только на ожидании медленных '
+            'клиентов.'
+        )
+
+    @staticmethod
+    def request(url, path, headers):
+        """Send one request over a new connection, as nginx does."""
+        parts = urlsplit(url)
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection(parts.hostname, parts.port,
+                                                timeout=30)
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status < 400
+        except OSError:
+            ok = False
+        finally:
+            connection.close()
+        return time.perf_counter() - started, ok
+
+    def run(self, url, path, headers, count, concurrency):
+        # Warm up caches and connections of every worker first.
+        for _ in range(concurrency):
+            self.request(url, path, headers)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(
+                lambda _: self.request(url, path, headers), range(count)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for latency, _ in results)
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'rps': count / elapsed,
+            'p50': percentiles[49] * 1000,
+            'p95': percentiles[94] * 1000,
+            'p99': percentiles[98] * 1000,
+            'errors': sum(not ok for _, ok in results),
+        }
+
+    def format_row(self, name, url, result):
+        row = (f'{name:<22}{url:<28}{result["rps"]:>9.0f}'
+               f'{result["p50"]:>9.1f}{result["p95"]:>9.1f}'
+               f'{result["p99"]:>9.1f}{result["errors"]:>8}')
+        return self.style.ERROR(row) if result['errors'] else row
@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время полнотекстового поиска рецептов по мере роста '
+            'таблицы в сравнении с ILIKE. Данные создаются внутри '
+            'транзакции, которая откатывается по завершении')
+
+    WORDS = (
+        'суп', 'салат', 'курица', 'говядина', 'рыба', 'картофель', 'лук',
+        'морковь', 'сыр', 'томаты', 'чеснок', 'грибы', 'рис', 'гречка',
+        'паста', 'яйца', 'сметана', 'зелень', 'перец', 'тыква', 'яблоки',
+        'творог', 'печь', 'жарить', 'варить', 'тушить', 'запекать',
+        'быстрый', 'домашний', 'острый', 'сладкий', 'праздничный',
+        'ужин', 'завтрак', 'обед', 'соус', 'тесто', 'пирог', 'каша',
+        'котлеты',
+    )
+    # Appears in a fixed number of recipes whatever the table size.
+    RARE_WORD = 'кумкват'
+    COMMON_WORD = 'курица'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,40000,160000',
+                            help='Размеры таблицы рецептов через запятую')
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--matches', type=int, default=20,
+                            help='Рецептов с редким словом')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Повторов каждого запроса (берётся '
+                                 'медиана)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes: ожидаются целые числа через '
+                               'запятую.')
+        random.seed(options['seed'])
+        self.stdout.write(
+            f'{"рецептов":>10}{"поиск, редкое":>16}{"поиск, частое":>16}'
+            f'{"ILIKE, редкое":>16}'
+        )
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+                self.authors = User.objects.bulk_create(
+                    User(username=f'search_bench{i}',
+                         email=f'search_bench{i}@example.com', password='!')
+                    for i in range(options['authors'])
+                )
+                self.create_recipes(options['matches'], self.RARE_WORD)
+                for size in sizes:
+                    self.create_recipes(size - Recipe.objects.count())
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE recipes_recipe, users_user')
+                    self.stdout.write(self.measure(size, options['repeat']))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_recipes(self, count, word=None):
+        def words(count):
+            return ' '.join(random.choices(self.WORDS, k=count))
+
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=random.choice(self.authors),
+                    name=words(3),
+                    image='recipes/bench.jpg',
+                    text=f'{words(15)} {word or ""} {words(15)}',
+                    cooking_time=random.randint(1, 240),
+                )
+                for _ in range(max(count, 0))
+            ),
+            batch_size=5000,
+        )
+
+    def measure(self, size, repeat):
+        client = APIClient()
+        client.force_authenticate(self.authors[0])
+
+        def search(word):
+            response = client.get('/api/recipes/', {'search': word})
+            if response.status_code != 200:
+                raise CommandError(f'Поиск вернул {response.status_code}.')
+
+        def ilike(word):
+            queryset = Recipe.objects.filter(
+                Q(name__icontains=word) | Q(text__icontains=word))
+            queryset.count()
+            list(queryset.values_list('id', flat=True)[:6])
+
+        timings = [
+            self.time(lambda: search(self.RARE_WORD), repeat),
+            self.time(lambda: search(self.COMMON_WORD), repeat),
+            self.time(lambda: ilike(self.RARE_WORD), repeat),
+        ]
+        return f'{size:>10}' + ''.join(f'{ms:>13.1f} мс' for ms in timings)
+
+    @staticmethod
+    def time(function, repeat):
+        function()
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
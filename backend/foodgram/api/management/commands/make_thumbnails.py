@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from images import update_thumbnail
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие миниатюры рецептов и аватаров, '
+            'например после импорта данных')
+
+    # model, source field, thumbnail field
+    TARGETS = (
+        (Recipe, 'image', 'thumbnail'),
+        (User, 'avatar', 'avatar_thumbnail'),
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for model, source, target in self.TARGETS:
+            updated = 0
+            objects = model.objects.only('id', source, target).order_by('id')
+            for instance in objects.iterator():
+                updated += update_thumbnail(instance, source, target)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обновлено '
+                f'миниатюр {updated}.'))
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.2f} с.')
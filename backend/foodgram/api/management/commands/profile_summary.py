@@ -0,0 +1,74 @@
+import glob
+import os
+import pstats
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Index of a column in ``pstats.Stats.stats`` values.
+SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}
+
+
+def parse_name(path):
+    """``RecipeViewSet.list.<time>.<total>ms.prof`` -> (endpoint, total)."""
+    endpoint, _, total, _ = os.path.basename(path).rsplit('.', 3)
+    return endpoint, int(total.removesuffix('ms'))
+
+
+class Command(BaseCommand):
+    help = ('Сводка по дампам cProfile медленных запросов, '
+            'сгруппированная по эндпоинтам')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILING_DIR,
+                            help='Каталог с дампами')
+        parser.add_argument('--endpoint',
+                            help='Показать только этот эндпоинт, '
+                                 'например RecipeViewSet.list')
+        parser.add_argument('--limit', type=int, default=15,
+                            help='Количество функций для эндпоинта')
+        parser.add_argument('--sort', choices=SORT_KEYS,
+                            default='cumulative',
+                            help='Порядок функций')
+
+    def handle(self, *args, **options):
+        dumps = defaultdict(list)
+        for path in glob.glob(os.path.join(options['dir'], '*.prof')):
+            try:
+                endpoint, total = parse_name(path)
+            except ValueError:
+                continue
+            if options['endpoint'] in (None, endpoint):
+                dumps[endpoint].append((path, total))
+        if not dumps:
+            raise CommandError(f'Нет дампов в каталоге {options["dir"]}.')
+
+        # The endpoints which took the most time in total go first.
+        for endpoint, items in sorted(
+                dumps.items(),
+                key=lambda item: -sum(total for _, total in item[1])):
+            totals = [total for _, total in items]
+            self.stdout.write(self.style.SUCCESS(
+                f'{endpoint}: запросов {len(totals)}, среднее '
+                f'{sum(totals) / len(totals):.0f} мс, максимум '
+                f'{max(totals)} мс'
+            ))
+            self.write_functions(pstats.Stats(*(path for path, _ in items)),
+                                 len(items), options)
+            self.stdout.write('')
+
+    def write_functions(self, stats, count, options):
+        """Print the top functions with their time per request."""
+        column = SORT_KEYS[options['sort']]
+        rows = sorted(stats.stats.items(),
+                      key=lambda item: -item[1][column])
+        self.stdout.write(f'{"вызовов":>10}{"собств. мс":>12}'
+                          f'{"всего мс":>12}  функция')
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in (
+                rows[:options['limit']]):
+            self.stdout.write(
+                f'{calls // count:>10}{tottime * 1000 / count:>12.1f}'
+                f'{cumtime * 1000 / count:>12.1f}  '
+                f'{os.path.basename(filename)}:{line}({name})'
+            )
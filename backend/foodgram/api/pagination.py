@@ -1,7 +1,159 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, F, Func, Value
+from rest_framework import exceptions
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from constants import FEED_LIMIT_MAX
 
 
 class Pagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Views that define ``cursor_ordering`` switch to ``KeysetPagination``
+    when the request asks for it with ``?pagination=cursor`` or passes
+    a ``cursor`` from a previous response. Cursor pages filter on the
+    ordering key instead of using OFFSET and do not count the total.
+    """
 
     page_size = 6
     page_size_query_param = "limit"
+    mode_query_param = "pagination"
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.is_cursor_request(request):
+            self.cursor_paginator = KeysetPagination(
+                ordering, page_size=self.page_size,
+                max_page_size=self.max_page_size)
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_cursor_request(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over the fields of ``ordering``.
+
+    The cursor holds the key of the last row of the page and the next
+    page starts strictly after it, compared as a row so an index on the
+    ordering fields is read from that point. No rows are skipped with
+    OFFSET and rows added meanwhile do not shift the pages. The fields
+    must identify a row uniquely and share one direction. Rows may be
+    model instances or dicts, such as ``recipe_states``. A queryset
+    ordered otherwise, e.g. by search rank, is rejected rather than
+    silently reordered.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = None
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    invalid_ordering_message = (
+        'Курсорная пагинация недоступна при другой сортировке, '
+        'например по релевантности поиска.'
+    )
+
+    def __init__(self, ordering=('-pub_date', '-id'), page_size=None,
+                 max_page_size=None):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+        if any(field.startswith('-') != self.descending
+               for field in self.ordering):
+            raise ValueError('Keyset fields must share one direction.')
+        self.page_size = page_size or self.page_size
+        self.max_page_size = max_page_size or self.max_page_size
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_position(self, request, model):
+        """Return the key the page starts after, if any."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            values = json.loads(b64decode(cursor.encode(), altchars=b'-_'))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return tuple(
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+    def after(self, position):
+        """Condition ``(fields) < (position)``, or ``>`` if ascending."""
+        return Func(
+            Func(*(F(field) for field in self.fields), function='ROW'),
+            Func(*(Value(value) for value in position), function='ROW'),
+            template='%(expressions)s',
+            arg_joiner=' < ' if self.descending else ' > ',
+            output_field=BooleanField(),
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if queryset.query.order_by not in ((), self.ordering):
+            raise exceptions.ValidationError(
+                {self.cursor_query_param: self.invalid_ordering_message})
+        position = self.get_position(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        page_size = self.get_page_size(request)
+        rows = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_key(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        cursor = b64encode(
+            # Dates keep their microseconds, unlike with DjangoJSONEncoder.
+            json.dumps(self.get_key(self.page[-1]),
+                       default=lambda value: value.isoformat()).encode(),
+            altchars=b'-_').decode()
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class FeedPagination(KeysetPagination):
+    """Keyset pagination of the feed, newest recipes first."""
+
+    max_page_size = FEED_LIMIT_MAX
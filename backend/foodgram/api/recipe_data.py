@@ -0,0 +1,120 @@
+"""
+Querysets and serialized data of recipes.
+
+Shared by ``RecipeViewSet`` and the async read views, which differ only
+in how the recipes missing from the cache are fetched.
+"""
+from django.db.models import Exists, OuterRef, Prefetch, Value
+
+from recipes.models import (FavoriteRecipe, Recipe, RecipeIngredient,
+                            ShoppingList)
+from users.models import Follow, User
+from .cache import get_cached_recipes, recipe_key, set_cached_recipes
+from .conditional import RESULT_FIELDS, recipe_state
+from .serializers import RecipeReadSerializer
+
+
+def annotate_is_subscribed(queryset, user):
+    """Annotate users with the ``is_subscribed`` flag for ``user``."""
+    if not user.is_authenticated:
+        return queryset.annotate(is_subscribed=Value(False))
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Follow.objects.filter(user=user, following=OuterRef('pk'))
+        )
+    )
+
+
+def prefetch_recipe_ingredients():
+    return Prefetch(
+        'recipe_ingredients',
+        queryset=RecipeIngredient.objects.select_related(
+            'ingredient').order_by('id')
+    )
+
+
+def recipes_queryset(user):
+    """Recipes with the favorite and shopping cart flags of ``user``."""
+    recipes = Recipe.objects.prefetch_related(
+        Prefetch('author', queryset=annotate_is_subscribed(
+            User.objects.all(), user)),
+        prefetch_recipe_ingredients(),
+    )
+    if user.is_authenticated:
+        return recipes.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(user=user,
+                                              recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingList.objects.filter(user=user,
+                                            recipe=OuterRef('pk'))
+            )
+        )
+    return recipes.annotate(
+        is_favorited=Value(False),
+        is_in_shopping_cart=Value(False)
+    )
+
+
+def with_user_state(data, state):
+    """
+    Copy of serialized recipe ``data`` with the flags and
+    ``RESULT_FIELDS`` from ``state``.
+    """
+    data = {
+        **data,
+        'author': {**data['author'],
+                   'is_subscribed': state['author_is_subscribed']},
+        'is_favorited': state['is_favorited'],
+        'is_in_shopping_cart': state['is_in_shopping_cart'],
+    }
+    for field in RESULT_FIELDS:
+        if field in state:
+            data[field] = state[field]
+    return data
+
+
+class RecipeData:
+    """
+    Serialized recipes of ``states``, reusing cached user-independent
+    parts.
+
+    Only recipes listed in ``missing`` have to be loaded, with
+    ``missing_recipes()``, and passed to ``add()``; the favorite, cart
+    and subscription flags are then filled in from ``states``.
+    """
+
+    def __init__(self, states, context):
+        self.states = states
+        self.context = context
+        self.base_url = context['request'].build_absolute_uri('/')
+        keys = [recipe_key(state, self.base_url) for state in states]
+        self.data_by_id = {
+            data['id']: data
+            for data in get_cached_recipes(keys).values()
+        }
+        self.missing = [state['id'] for state in states
+                        if state['id'] not in self.data_by_id]
+
+    def missing_recipes(self):
+        return Recipe.objects.filter(id__in=self.missing).select_related(
+            'author').prefetch_related(prefetch_recipe_ingredients())
+
+    def add(self, recipes):
+        fresh = {}
+        for recipe in recipes:
+            recipe.is_favorited = recipe.is_in_shopping_cart = False
+            recipe.author.is_subscribed = False
+            data = RecipeReadSerializer(recipe, context=self.context).data
+            # Keyed by the loaded versions, in case the recipe has
+            # changed since ``states`` were read.
+            fresh[recipe_key(recipe_state(recipe), self.base_url)] = data
+            self.data_by_id[recipe.id] = data
+        set_cached_recipes(fresh)
+
+    def results(self):
+        return [
+            with_user_state(self.data_by_id[state['id']], state)
+            for state in self.states if state['id'] in self.data_by_id
+        ]
@@ -0,0 +1,80 @@
+"""
+In-process search index for ingredient autocomplete.
+
+Lower-cased names are kept in a sorted array, so prefix matches are a
+contiguous slice found with binary search. The index is rebuilt lazily
+whenever the catalogue version from ``api.cache`` changes.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from recipes.models import Ingredient
+from .cache import get_ingredients_version
+
+# Sorts after any character that can appear in a name.
+_PREFIX_END = '\U0010ffff'
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+class IngredientIndex:
+    """Sorted array of ingredient names with ranked lookup."""
+
+    def __init__(self, ingredients):
+        rows = sorted(
+            (name.lower(), name, measurement_unit, pk)
+            for pk, name, measurement_unit in ingredients
+        )
+        self.keys = [row[0] for row in rows]
+        self.items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, name, measurement_unit, pk in rows
+        ]
+
+    def search(self, query, limit=None):
+        """
+        Return ingredients matching ``query``.
+
+        Exact matches come first, then other names starting with the
+        query, then names containing it; each group is alphabetical.
+        """
+        query = query.lower()
+        if not query:
+            return self.items[:limit]
+
+        # An exact match sorts before any longer name with the same
+        # prefix, so the prefix slice already starts with exact matches.
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + _PREFIX_END,
+                          lo=bisect_right(self.keys, query))
+        results = self.items[start:end]
+        if limit is not None and len(results) >= limit:
+            return results[:limit]
+
+        substring_matches = (
+            item for key, item in zip(self.keys, self.items)
+            if query in key and not key.startswith(query)
+        )
+        if limit is not None:
+            substring_matches = islice(substring_matches,
+                                       limit - len(results))
+        results.extend(substring_matches)
+        return results
+
+
+def get_ingredient_index():
+    """Return the index for the current catalogue version."""
+    global _index, _index_version
+    version = get_ingredients_version()
+    if _index_version != version:
+        with _index_lock:
+            if _index_version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit')
+                )
+                _index_version = version
+    return _index
@@ -1,12 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.fields import CurrentUserDefault
 from rest_framework.exceptions import ValidationError
-from drf_extra_fields.fields import Base64ImageField
 
-from recipes.models import (Recipe, Ingredient,
+from constants import AVATAR_MAX_SIDE
+from recipes.models import (CartIngredient, Recipe, Ingredient,
                             FavoriteRecipe, ShoppingList, RecipeIngredient)
+from tasks.models import Task
+from .fields import ProcessedImageField
 
 User = get_user_model()
 
@@ -15,7 +19,7 @@ class FoodgramUserSerializer(UserSerializer):
     """User serializer."""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False)
+    avatar = ProcessedImageField(required=False, max_side=AVATAR_MAX_SIDE)
 
     class Meta:
         fields = (
@@ -25,13 +29,16 @@ class FoodgramUserSerializer(UserSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
-            'avatar'
+            'avatar',
+            'avatar_thumbnail',
         )
         read_only_fields = fields
         model = User
 
     def get_is_subscribed(self, obj):
         """Check subscribe."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return user.is_authenticated and user.follows.filter(
             following=obj).exists()
@@ -57,10 +64,16 @@ class SimplifiedRecipeSerializer(serializers.ModelSerializer):
 
 
 class FollowUserSerializer(FoodgramUserSerializer):
-    """Subscriptions serializer."""
+    """
+    Subscriptions serializer.
+
+    Expects authors with prefetched ``limited_recipes``,
+    see ``annotate_subscriptions``.
+    """
 
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(source='recipes.count', read_only=True)
+    recipes = SimplifiedRecipeSerializer(source='limited_recipes', many=True,
+                                         read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -73,19 +86,11 @@ class FollowUserSerializer(FoodgramUserSerializer):
             'is_subscribed',
             'recipes',
             'recipes_count',
-            'avatar'
+            'avatar',
+            'avatar_thumbnail',
         )
         read_only_fields = fields
 
-    def get_recipes(self, obj):
-        """Get related recipes."""
-        recipes_limit = int(
-            self.context.get('request').query_params.get('recipes_limit', 10 ** 10)
-        )
-        return SimplifiedRecipeSerializer(
-            obj.recipes.all()[:recipes_limit], many=True, context=self.context
-        ).data
-
 
 class IngredientRecipeReadSerializer(serializers.ModelSerializer):
     """
@@ -131,18 +136,22 @@ class RecipeReadSerializer(serializers.ModelSerializer):
                                                  many=True, read_only=True)
 
     class Meta:
-        fields = ('id', 'author', 'name', 'image', 'text',
+        fields = ('id', 'author', 'name', 'image', 'thumbnail', 'text',
                   'ingredients', 'cooking_time',
                   'is_favorited', 'is_in_shopping_cart')
         read_only_fields = fields
         model = Recipe
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (user.is_authenticated and
                 FavoriteRecipe.objects.filter(user=user, recipe=obj).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_authenticated:
             return ShoppingList.objects.filter(user=user, recipe=obj).exists()
@@ -171,7 +180,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     author = FoodgramUserSerializer(
         read_only=True, default=CurrentUserDefault())
-    image = Base64ImageField()
+    image = ProcessedImageField()
     ingredients = IngredientRecipeWriteSerializer(
         many=True,
     )
@@ -225,12 +234,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             for ingredient in ingredients
         ])
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         recipe = super().create(validated_data)
         self._add_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         instance.ingredients.clear()
@@ -239,3 +250,31 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             ingredients
         )
         return instance
+
+
+class CartIngredientSerializer(IngredientRecipeReadSerializer):
+    """Serializer for ingredient totals of the shopping cart."""
+
+    class Meta(IngredientRecipeReadSerializer.Meta):
+        model = CartIngredient
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    """Background task status; a result file becomes a download link."""
+
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = ('id', 'status', 'attempts', 'created_at',
+                  'finished_at', 'result')
+        read_only_fields = fields
+        model = Task
+
+    def get_result(self, obj):
+        if isinstance(obj.result, dict) and 'path' in obj.result:
+            result = {key: value for key, value in obj.result.items()
+                      if key != 'path'}
+            result['url'] = self.context['request'].build_absolute_uri(
+                reverse('tasks-download', args=[obj.pk]))
+            return result
+        return obj.result
@@ -0,0 +1,154 @@
+"""
+Shopping list exporters.
+
+All renderers read the same aggregated data and yield the document
+piece by piece, so the response can be streamed without building it
+in memory.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.utils.html import escape
+
+from recipes.models import CartIngredient, Recipe
+
+
+class ShoppingListData:
+    """Aggregated ingredients and recipes of the user's shopping cart."""
+
+    def __init__(self, user):
+        self.user = user
+        self.created = datetime.now()
+
+    @property
+    def ingredients(self):
+        # Totals are kept up to date by triggers, see ``cart_totals``.
+        rows = (
+            CartIngredient.objects
+            .filter(user=self.user)
+            .values_list('ingredient__name', 'ingredient__measurement_unit',
+                         'amount')
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
+            .iterator()
+        )
+        return ({'name': name, 'measurement_unit': unit, 'amount': amount}
+                for name, unit, amount in rows)
+
+    @property
+    def recipes(self):
+        return (
+            Recipe.objects
+            .filter(shopping_cart__user=self.user)
+            .select_related('author')
+            .order_by('name', 'id')
+            .iterator()
+        )
+
+    @staticmethod
+    def author_name(recipe):
+        return recipe.author.get_full_name() or recipe.author.username
+
+
+class BaseExporter:
+    """Base class for shopping list renderers."""
+
+    content_type = None
+    extension = None
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def filename(self):
+        return f'shopping-list.{self.extension}'
+
+    def render(self):
+        """Yield chunks of the document."""
+        raise NotImplementedError
+
+
+class TextExporter(BaseExporter):
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def render(self):
+        created = self.data.created.strftime('%d %b %Y %H:%M:%S')
+        yield f'Список покупок. Составлен: {created}.\n\nПродукты:\n'
+        for idx, item in enumerate(self.data.ingredients, start=1):
+            yield (f"{idx}. {item['name'].capitalize()} — "
+                   f"{item['amount']} {item['measurement_unit']}\n")
+        yield '\nРецепты:\n'
+        for recipe in self.data.recipes:
+            yield (f'{recipe.name} '
+                   f'(Автор: {self.data.author_name(recipe)})\n')
+
+
+class CsvExporter(BaseExporter):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    class Echo:
+        """File-like object which returns written rows instead of storing."""
+
+        def write(self, value):
+            return value
+
+    def render(self):
+        writer = csv.writer(self.Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in self.data.ingredients:
+            yield writer.writerow(
+                (item['name'], item['measurement_unit'], item['amount'])
+            )
+
+
+class JsonExporter(BaseExporter):
+    content_type = 'application/json'
+    extension = 'json'
+
+    def render(self):
+        created = json.dumps(self.data.created.isoformat())
+        yield f'{{"created": {created}, "ingredients": ['
+        for idx, item in enumerate(self.data.ingredients):
+            yield (',' if idx else '') + json.dumps(item, ensure_ascii=False)
+        yield '], "recipes": ['
+        for idx, recipe in enumerate(self.data.recipes):
+            yield (',' if idx else '') + json.dumps(
+                {'id': recipe.id, 'name': recipe.name,
+                 'author': self.data.author_name(recipe)},
+                ensure_ascii=False
+            )
+        yield ']}'
+
+
+class HtmlExporter(BaseExporter):
+    content_type = 'text/html; charset=utf-8'
+    extension = 'html'
+
+    def render(self):
+        created = self.data.created.strftime('%d %b %Y %H:%M:%S')
+        yield ('<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+               '<title>Список покупок</title><style>'
+               'body{font-family:sans-serif}'
+               'td,th{padding:4px 8px;border-bottom:1px solid #ccc}'
+               '</style></head><body>'
+               f'<h1>Список покупок</h1><p>Составлен: {created}.</p>'
+               '<h2>Продукты</h2><table><tr><th>№</th><th>Продукт</th>'
+               '<th>Количество</th></tr>')
+        for idx, item in enumerate(self.data.ingredients, start=1):
+            yield (f'<tr><td>{idx}</td>'
+                   f'<td>{escape(item["name"].capitalize())}</td>'
+                   f'<td>{item["amount"]} '
+                   f'{escape(item["measurement_unit"])}</td></tr>')
+        yield '</table><h2>Рецепты</h2><ul>'
+        for recipe in self.data.recipes:
+            yield (f'<li>{escape(recipe.name)} (Автор: '
+                   f'{escape(self.data.author_name(recipe))})</li>')
+        yield '</ul></body></html>'
+
+
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (TextExporter, CsvExporter, JsonExporter, HtmlExporter)
+}
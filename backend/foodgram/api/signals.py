@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from images import thumbnail_outdated
+from recipes.models import Ingredient, Recipe
+from tasks.models import Task
+from users.models import Follow, User
+from .cache import invalidate_ingredients, invalidate_recipe_ingredients
+from .conditional import touch_ingredient_recipes
+from .feed import needs_timeline
+from .tasks import (build_feed_timeline, export_shopping_list, export_storage,
+                    refresh_thumbnail)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    """Invalidate the cached catalogue when an ingredient changes."""
+    invalidate_ingredients()
+
+
+@receiver(post_delete, sender=Ingredient)
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_ingredients_changed(**kwargs):
+    """
+    Ingredient lists change with their recipes, which are saved
+    atomically with them, and with deleted ingredients.
+    """
+    transaction.on_commit(invalidate_recipe_ingredients)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_recipes_changed(instance, created=False, **kwargs):
+    """Recipes show ingredient names, so their validators must change."""
+    if not created:
+        touch_ingredient_recipes([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    if thumbnail_outdated(instance, 'image', 'thumbnail'):
+        refresh_thumbnail.delay('recipes.Recipe', instance.pk,
+                                'image', 'thumbnail')
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, **kwargs):
+    if thumbnail_outdated(instance, 'avatar', 'avatar_thumbnail'):
+        refresh_thumbnail.delay('users.User', instance.pk,
+                                'avatar', 'avatar_thumbnail')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(instance, created, **kwargs):
+    if created and needs_timeline(instance.user_id):
+        build_feed_timeline.delay(instance.user_id, user=instance.user)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(instance, **kwargs):
+    """Exports are only reachable through their task."""
+    if (instance.name == export_shopping_list.task_name
+            and isinstance(instance.result, dict)
+            and instance.result.get('path')):
+        path = instance.result['path']
+        transaction.on_commit(lambda: export_storage().delete(path))
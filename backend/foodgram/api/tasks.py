@@ -0,0 +1,47 @@
+"""Background tasks of the API, see ``tasks.queue``."""
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from images import update_thumbnail
+from tasks.queue import task
+from .feed import build_timeline
+from .shopping_list import EXPORTERS, ShoppingListData
+
+User = get_user_model()
+
+
+def export_storage():
+    """Private storage of exports, served by ``TaskViewSet.download``."""
+    return FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+@task()
+def refresh_thumbnail(model_label, pk, source, target):
+    """Regenerate the thumbnail of a saved recipe image or avatar."""
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None:
+        return False
+    return update_thumbnail(instance, source, target)
+
+
+@task()
+def build_feed_timeline(user_id):
+    """Precompute the feed of a user who follows many authors."""
+    return build_timeline(user_id)
+
+
+@task()
+def export_shopping_list(user_id, export_format):
+    """Render the shopping list to a file in the export storage."""
+    exporter = EXPORTERS[export_format](
+        ShoppingListData(User.objects.get(pk=user_id)))
+    path = export_storage().save(
+        f'{uuid.uuid4()}.{exporter.extension}',
+        ContentFile(''.join(exporter.render()).encode()),
+    )
+    return {'path': path, 'filename': exporter.filename}
@@ -1,9 +1,12 @@
+from django.conf import settings
 from rest_framework_nested.routers import DefaultRouter
 from django.urls import path, include
 
 
+from .async_views import (async_read, ingredient_list, recipe_detail,
+                          recipe_list)
 from .viewsets import (FoodgramUserViewSet, FollowViewSet,
-                       IngredientViewSet, RecipeViewSet)
+                       IngredientViewSet, RecipeViewSet, TaskViewSet)
 
 router = DefaultRouter()
 
@@ -11,9 +14,23 @@ router.register('users/subscriptions', FollowViewSet, basename='subscriptions')
 router.register('users', FoodgramUserViewSet)
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
+router.register('tasks', TaskViewSet, basename='tasks')
 
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_VIEWS:
+    # Take precedence over the router for the read-heavy endpoints.
+    urlpatterns = [
+        path('recipes/', async_read(recipe_list, RecipeViewSet.as_view(
+            {'get': 'list', 'post': 'create'}))),
+        path('recipes/<int:pk>/', async_read(
+            recipe_detail, RecipeViewSet.as_view(
+                {'get': 'retrieve', 'put': 'update',
+                 'patch': 'partial_update', 'delete': 'destroy'}))),
+        path('ingredients/', async_read(
+            ingredient_list, IngredientViewSet.as_view({'get': 'list'}))),
+    ] + urlpatterns
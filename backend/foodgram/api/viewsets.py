@@ -1,37 +1,109 @@
-from collections import defaultdict
-from datetime import datetime
-from django.http import FileResponse, Http404
-from io import BytesIO
-from django.db.models import Exists, OuterRef, Value
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.db.models import F, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import viewsets, UserViewSet
 from rest_framework import status, mixins
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from .serializers import (FollowUserSerializer,
+from .serializers import (CartIngredientSerializer, FollowUserSerializer,
                           IngredientSerializer, RecipeReadSerializer,
-                          RecipeWriteSerializer, SimplifiedRecipeSerializer)
-from recipes.models import (Ingredient, Recipe,
-                            FavoriteRecipe, ShoppingList, RecipeIngredient)
+                          RecipeWriteSerializer, SimplifiedRecipeSerializer,
+                          TaskSerializer)
+from recipes.models import (CartIngredient, Ingredient, Recipe,
+                            FavoriteRecipe, ShoppingList)
+from tasks.models import Task
 from users.models import Follow
+from constants import (COOK_INGREDIENTS_MAX, RECIPES_LIMIT_DEFAULT,
+                       RECIPES_LIMIT_MAX)
+from metrics import record_mutation
+from .cache import (get_cached_ingredients, get_ingredients_version,
+                    set_cached_ingredients)
+from .conditional import (get_etag, get_last_modified, get_not_modified,
+                          recipe_states, set_validators)
+from .coverage import rank_recipes
+from .feed import feed_recipe_ids
 from .filters import RecipeFilter, IngredientFilter
-from .pagination import Pagination
+from .pagination import FeedPagination, Pagination
 from .permissions import IsAuthorOrReadOnly
+from .recipe_data import (RecipeData, annotate_is_subscribed,
+                          recipes_queryset)
+from .search import get_ingredient_index
+from .shopping_list import EXPORTERS, ShoppingListData
+from .tasks import export_shopping_list, export_storage
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Parse ``recipes_limit``, capped to keep subscription pages small."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return RECIPES_LIMIT_DEFAULT
+    if not recipes_limit.isdigit():
+        raise ValidationError(
+            {'recipes_limit': 'Должно быть целым неотрицательным числом.'})
+    return min(int(recipes_limit), RECIPES_LIMIT_MAX)
+
+
+def get_ingredient_ids(request):
+    """Parse ``ingredients``, given repeated or comma-separated."""
+    values = [
+        value
+        for param in request.query_params.getlist('ingredients')
+        for value in param.split(',') if value
+    ]
+    if not values:
+        raise ValidationError(
+            {'ingredients': 'Укажите хотя бы один продукт.'})
+    if not all(value.isdigit() for value in values):
+        raise ValidationError(
+            {'ingredients': 'Должно быть списком целых чисел.'})
+    if len(values) > COOK_INGREDIENTS_MAX:
+        raise ValidationError(
+            {'ingredients': f'Не больше {COOK_INGREDIENTS_MAX} продуктов.'})
+    return [int(value) for value in values]
+
+
+def annotate_subscriptions(queryset, recipes_limit):
+    """
+    Prepare followed authors for ``FollowUserSerializer``.
+
+    The newest ``recipes_limit`` recipes of every author on the page are
+    fetched with one windowed prefetch; ``recipes_count`` is a counter
+    column on the user.
+    """
+    limited_recipes = Recipe.objects.annotate(
+        row_number=Window(RowNumber(), partition_by=F('author'),
+                          order_by=(F('pub_date').desc(), F('id').desc()))
+    ).filter(row_number__lte=recipes_limit)
+    return queryset.annotate(
+        is_subscribed=Value(True),
+    ).prefetch_related(
+        Prefetch('recipes', queryset=limited_recipes,
+                 to_attr='limited_recipes')
+    )
+
+
 class FoodgramUserViewSet(UserViewSet):
     """Viewset for users."""
 
     queryset = User.objects.all()
     pagination_class = Pagination
+    cursor_ordering = ('username',)
+
+    def get_queryset(self):
+        return annotate_is_subscribed(super().get_queryset(),
+                                      self.request.user)
 
     @action(["get"], detail=False, permission_classes=(IsAuthenticated, ))
     def me(self, request, *args, **kwargs):
@@ -78,6 +150,7 @@ class FoodgramUserViewSet(UserViewSet):
         author = get_object_or_404(User, pk=id)
 
         if request.method == "POST":
+            recipes_limit = get_recipes_limit(request)
             if user == author:
                 return Response(
                     {'errors': 'Нельзя подписаться на самого себя.'},
@@ -90,6 +163,10 @@ class FoodgramUserViewSet(UserViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            author = annotate_subscriptions(
+                User.objects.filter(pk=author.pk), recipes_limit
+            ).get()
+            record_mutation(Follow, 'add')
             serializer = FollowUserSerializer(author, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -101,6 +178,7 @@ class FoodgramUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         follow_instance.delete()
+        record_mutation(Follow, 'remove')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -112,8 +190,10 @@ class FollowViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     ordering = ('id',)
 
     def get_queryset(self):
-        return User.objects.filter(pk__in=self.request.user.
-                                   follows.values_list('following', flat=True))
+        return annotate_subscriptions(
+            User.objects.filter(authors__user=self.request.user),
+            get_recipes_limit(self.request)
+        ).order_by('username')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -131,6 +211,47 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """
+        List ingredients from the versioned cache.
+
+        The catalogue version doubles as the ETag, so clients holding
+        an up-to-date copy get 304 Not Modified.
+        """
+        version = get_ingredients_version()
+        etag = f'"{version}"'
+        if_none_match = request.headers.get('If-None-Match', '')
+        if if_none_match == '*' or etag in parse_etags(if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+
+        name = request.query_params.get('name', '')
+        limit = self.get_limit()
+        data = get_cached_ingredients(version, name, limit)
+        if data is None:
+            data = self.search(name, limit)
+            set_cached_ingredients(version, name, limit, data)
+        return Response(data, headers={'ETag': etag})
+
+    def get_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return None
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValidationError(
+                {'limit': 'Должно быть целым положительным числом.'})
+        return int(limit)
+
+    def search(self, name, limit):
+        """
+        Search with the in-process index, or in the database when it is
+        disabled in settings.
+        """
+        if settings.INGREDIENTS_SEARCH_INDEX:
+            return get_ingredient_index().search(name, limit)
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        return self.get_serializer(queryset, many=True).data
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Viewset for recipes."""
@@ -139,25 +260,128 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     ordering = ('-pub_date',)
     pagination_class = Pagination
+    cursor_ordering = ('-pub_date', '-id')
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            return Recipe.objects.annotate(
-                is_favorited=Exists(
-                    FavoriteRecipe.objects.filter(user=user,
-                                                  recipe=OuterRef('pk'))
-                ),
-                is_in_shopping_cart=Exists(
-                    ShoppingList.objects.filter(user=user,
-                                                recipe=OuterRef('pk'))
-                )
-            ).all()
-        return Recipe.objects.annotate(
-            is_favorited=Value(False),
-            is_in_shopping_cart=Value(False)
-        ).all()
+        return recipes_queryset(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List recipes starting from the state of the page.
+
+        One query fetches ids, modification times and per-user flags of
+        the page. They give the ETag, so an unchanged page is answered
+        with 304, and the cache keys of the recipes.
+        """
+        states = self.paginate_queryset(recipe_states(
+            self.filter_queryset(self.get_queryset()), request.user))
+        etag = get_etag(states, self.get_page_meta())
+        not_modified = get_not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = self.get_paginated_response(self.get_recipes_data(states))
+        set_validators(request, response, etag)
+        return response
+
+    def get_page_meta(self):
+        """Count and links of the current page, which are part of the body."""
+        data = self.get_paginated_response([]).data
+        return [(key, value) for key, value in data.items()
+                if key != 'results']
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get a recipe with ETag and, for anonymous users, Last-Modified.
+
+        Favorite, cart and subscription flags have no timestamps, so
+        authenticated clients revalidate with the ETag only.
+        """
+        state = get_object_or_404(
+            recipe_states(self.get_queryset(), request.user),
+            pk=kwargs['pk']
+        )
+        etag = get_etag([state])
+        last_modified = (None if request.user.is_authenticated
+                         else get_last_modified(state))
+        not_modified = get_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = self.get_recipes_data([state])
+        if not data:
+            raise Http404
+        response = Response(data[0])
+        set_validators(request, response, etag, last_modified)
+        return response
+
+    def get_recipes_data(self, states):
+        """Serialize recipes, see ``RecipeData``."""
+        data = RecipeData(states, self.get_serializer_context())
+        if data.missing:
+            data.add(data.missing_recipes())
+        return data.results()
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """
+        Newest recipes of the followed authors, see ``api.feed``.
+
+        Pages are keyset-paginated: ``next`` links to the page below
+        the last recipe, ``limit`` sets the page size.
+        """
+        paginator = FeedPagination()
+        recipe_ids = feed_recipe_ids(request.user,
+                                     paginator.get_page_size(request) + 1,
+                                     paginator.get_position(request, Recipe))
+        states = paginator.paginate_queryset(
+            recipe_states(
+                self.get_queryset().filter(id__in=recipe_ids),
+                request.user
+            ).order_by('-pub_date', '-id'),
+            request, self
+        )
+        etag = get_etag(states, paginator.get_next_link())
+        not_modified = get_not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = paginator.get_paginated_response(
+            self.get_recipes_data(states))
+        set_validators(request, response, etag)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def what_to_cook(self, request):
+        """
+        Recipes with any of the ``ingredients``, best covered first.
+
+        Each result has its ``coverage``, the share of the recipe's
+        ingredients among the given ones, see ``api.coverage``.
+        """
+        paginator = Pagination()
+        rows = paginator.paginate_queryset(
+            rank_recipes(get_ingredient_ids(request)), request)
+        coverage = {row['recipe']: row['coverage'] for row in rows}
+        states = {
+            state['id']: {**state, 'coverage': coverage[state['id']]}
+            for state in recipe_states(
+                self.get_queryset().filter(id__in=coverage), request.user)
+        }
+        states = [states[pk] for pk in coverage if pk in states]
+        etag = get_etag(states, (paginator.page.paginator.count,
+                                 paginator.get_next_link(),
+                                 list(coverage.values())))
+        not_modified = get_not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = paginator.get_paginated_response(
+            self.get_recipes_data(states))
+        set_validators(request, response, etag)
+        return response
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -193,6 +417,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {'errors': f'Рецепт "{recipe.name}" уже '
                                f'в {model._meta.verbose_name}.'},
                     status=status.HTTP_400_BAD_REQUEST)
+            record_mutation(model, 'add')
             serializer = (
                 SimplifiedRecipeSerializer(recipe,
                                            context={'request': request}))
@@ -205,6 +430,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {'errors': f'Рецепта "{recipe.name}" нет '
                                f'в {model._meta.verbose_name}.'},
                     status=status.HTTP_400_BAD_REQUEST)
+            record_mutation(model, 'remove')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def handle_relation(self, request, model, pk=None):
@@ -218,45 +444,76 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='download_shopping_cart')
     def download_shopping_cart(self, request):
-        """Download shopping cart as txt."""
-        user = request.user
-        recipes = Recipe.objects.filter(shopping_cart__user=user)
-        ingredients = RecipeIngredient.objects.filter(recipe__in=recipes)
-
-        shopping_data = defaultdict(float)
-
-        for item in ingredients:
-            ingredient_name = item.ingredient.name.capitalize()
-            measurement_unit = item.ingredient.measurement_unit
-            key = (ingredient_name, measurement_unit)
-            shopping_data[key] += item.amount
-
-        product_lines = []
-        for idx, ((ingredient_name, unit), amount) in enumerate(shopping_data.items(), start=1):
-            product_lines.append(f"{idx}. {ingredient_name} — {amount} {unit}")
-
-        recipe_lines = []
-        unique_recipes = set()
-        for recipe in recipes:
-            if recipe not in unique_recipes:
-                unique_recipes.add(recipe)
-                author_name = recipe.author.get_full_name() or recipe.author.username
-                recipe_lines.append(f"{recipe.name} (Автор: {author_name})")
-
-        content = '\n'.join([
-            f"Список покупок. Составлен: {datetime.now().strftime('%d %b %Y %H:%M:%S')}.",
-            "",
-            "Продукты:",
-            *product_lines,
-            "",
-            "Рецепты:",
-            *recipe_lines,
-        ])
-
-        buffer = BytesIO(content.encode('utf-8'))
-        return FileResponse(buffer, as_attachment=True, filename='shopping-list.txt')
+        """
+        Download shopping cart.
+
+        The ``format`` query parameter selects txt (default), csv,
+        json or printable html. With ``background=1`` the file is built
+        by a worker; the response describes the task to poll.
+        """
+        export_format = request.query_params.get('format', 'txt')
+        exporter_class = EXPORTERS.get(export_format)
+        if exporter_class is None:
+            return Response(
+                {'errors': f'Неизвестный формат "{export_format}". '
+                           f'Доступны: {", ".join(EXPORTERS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.query_params.get('background') in ('1', 'true'):
+            task = export_shopping_list.delay(request.user.pk, export_format,
+                                              user=request.user)
+            return Response(
+                TaskSerializer(task, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+        exporter = exporter_class(ShoppingListData(request.user))
+        response = StreamingHttpResponse(exporter.render(),
+                                         content_type=exporter.content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{exporter.filename}"'
+        )
+        return response
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_summary(self, request):
+        """Ingredient totals of the shopping cart as JSON."""
+        ingredients = (
+            CartIngredient.objects
+            .filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
+        )
+        return Response({
+            'recipes_count': ShoppingList.objects.filter(
+                user=request.user).count(),
+            'ingredients': CartIngredientSerializer(ingredients,
+                                                    many=True).data,
+        })
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
         return self.handle_relation(request, FavoriteRecipe, pk)
+
+
+class TaskViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Status of the user's background tasks, e.g. exports."""
+
+    serializer_class = TaskSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file built by a finished task of the user."""
+        task = self.get_object()
+        result = task.result if isinstance(task.result, dict) else {}
+        path = result.get('path')
+        storage = export_storage()
+        if task.status != Task.DONE or not path or not storage.exists(path):
+            raise Http404
+        return FileResponse(storage.open(path), as_attachment=True,
+                            filename=result.get('filename'))
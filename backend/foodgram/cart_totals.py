@@ -0,0 +1,124 @@
+"""
+Per-user shopping cart totals maintained by PostgreSQL triggers.
+
+``recipes_cartingredient`` holds the summed amount of every ingredient
+in a user's shopping cart, so the shopping list is read with a single
+indexed query instead of aggregating all cart recipes.
+
+Rows are adjusted by statement-level triggers on both tables the totals
+depend on: cart entries (``recipes_shoppinglist``) and recipe
+ingredients (``recipes_recipeingredient``). Each trigger only counts the
+pairs whose other half exists at that moment, so deleting a recipe
+gives the right totals whichever of its cart entries and ingredients
+are deleted first. Both triggers lock the rows of the recipes they
+touch before reading the other table, so a cart entry and an ingredient
+of the same recipe added by concurrent transactions are counted by the
+later one. A total dropping below zero fails the check constraint
+instead of being hidden.
+"""
+
+# Tables whose changes move the totals.
+SOURCES = ('recipes_shoppinglist', 'recipes_recipeingredient')
+
+# Totals computed from scratch, used by the backfill and the recount.
+ACTUAL_TOTALS = """
+    SELECT s.user_id, i.ingredient_id, SUM(i.amount) AS amount,
+           COUNT(*) AS recipes_count
+    FROM recipes_shoppinglist s
+    JOIN recipes_recipeingredient i USING (recipe_id)
+    GROUP BY s.user_id, i.ingredient_id
+"""
+
+REBUILD_SQL = f"""
+    DELETE FROM recipes_cartingredient;
+    INSERT INTO recipes_cartingredient
+        (user_id, ingredient_id, amount, recipes_count)
+    {ACTUAL_TOTALS};
+"""
+
+# Number of cart totals which differ from the actual ones.
+DRIFT_SQL = f"""
+    SELECT COUNT(*) FROM recipes_cartingredient c
+    FULL JOIN ({ACTUAL_TOTALS}) a USING (user_id, ingredient_id)
+    WHERE c.amount IS DISTINCT FROM a.amount
+       OR c.recipes_count IS DISTINCT FROM a.recipes_count
+"""
+
+# ``cart_rows`` selects the (user, ingredient, amount) rows the changed
+# rows contribute to the totals. Updates first add the new rows, so no
+# total drops to zero and gets deleted only to be inserted again.
+# Locking the recipes makes a concurrent change of the other table wait
+# for this transaction, and the queries after the lock see committed
+# changes, since each statement takes a new snapshot.
+CART_TOTALS_FUNCTION = """
+CREATE OR REPLACE FUNCTION foodgram_update_cart_totals()
+RETURNS trigger AS $$
+DECLARE
+    recipes text := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT recipe_id FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT recipe_id FROM old_rows'
+        ELSE 'SELECT recipe_id FROM new_rows
+            UNION SELECT recipe_id FROM old_rows' END;
+    cart_rows text := CASE TG_TABLE_NAME
+        WHEN 'recipes_shoppinglist' THEN 'SELECT r.user_id, i.ingredient_id,
+            i.amount FROM %I r JOIN recipes_recipeingredient i
+            USING (recipe_id)'
+        ELSE 'SELECT s.user_id, r.ingredient_id, r.amount FROM %I r
+            JOIN recipes_shoppinglist s USING (recipe_id)' END;
+    totals text := 'SELECT user_id, ingredient_id, SUM(amount) AS amount,
+        COUNT(*) AS n FROM (%s) c GROUP BY user_id, ingredient_id';
+BEGIN
+    EXECUTE format('SELECT id FROM recipes_recipe WHERE id IN (%s)
+        ORDER BY id FOR NO KEY UPDATE', recipes);
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('INSERT INTO recipes_cartingredient AS t
+            (user_id, ingredient_id, amount, recipes_count) %s
+            ON CONFLICT (user_id, ingredient_id) DO UPDATE
+            SET amount = t.amount + EXCLUDED.amount,
+                recipes_count = t.recipes_count + EXCLUDED.recipes_count',
+            format(totals, format(cart_rows, 'new_rows')));
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        EXECUTE format('UPDATE recipes_cartingredient t
+            SET amount = t.amount - d.amount,
+                recipes_count = t.recipes_count - d.n
+            FROM (%s) d WHERE t.user_id = d.user_id
+            AND t.ingredient_id = d.ingredient_id',
+            format(totals, format(cart_rows, 'old_rows')));
+        -- Served by the partial cart_ingredient_empty_idx.
+        DELETE FROM recipes_cartingredient WHERE recipes_count = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def cart_totals_sql():
+    """
+    Return SQL that backfills the cart totals and creates the triggers,
+    and SQL that drops them.
+    """
+    sql = [CART_TOTALS_FUNCTION, REBUILD_SQL]
+    reverse_sql = []
+    for source in SOURCES:
+        name = f'{source}_cart_totals'
+        sql.append(f"""
+        CREATE TRIGGER {name}_insert AFTER INSERT ON {source}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_cart_totals();
+        CREATE TRIGGER {name}_delete AFTER DELETE ON {source}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_cart_totals();
+        CREATE TRIGGER {name}_update AFTER UPDATE ON {source}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_cart_totals();
+        """)
+        reverse_sql.append(f"""
+        DROP TRIGGER IF EXISTS {name}_insert ON {source};
+        DROP TRIGGER IF EXISTS {name}_delete ON {source};
+        DROP TRIGGER IF EXISTS {name}_update ON {source};
+        """)
+    reverse_sql.append(
+        'DROP FUNCTION IF EXISTS foodgram_update_cart_totals();')
+    return '\n'.join(sql), '\n'.join(reverse_sql)
@@ -5,3 +5,15 @@ MAX_NAME_LEN = 150
 MAX_SURNAME_LEN = 150
 MAX_USERNAME_LEN = 150
 MAX_EMAIL_LEN = 254
+RECIPES_LIMIT_DEFAULT = 10
+RECIPES_LIMIT_MAX = 100
+FEED_LIMIT_MAX = 100
+COOK_INGREDIENTS_MAX = 100
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_SIDE = 1600
+AVATAR_MAX_SIDE = 512
+THUMBNAIL_SIDE = 320
+# WEBP or JPEG (saved as progressive).
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 80
@@ -0,0 +1,104 @@
+"""
+Denormalized counters maintained by PostgreSQL triggers.
+
+``COUNTERS`` lists every counter column together with the table whose
+rows it counts; it is used by the migrations that install the triggers
+and by the ``recount_counters`` management command.
+"""
+
+# (source table, foreign key column, target table, counter column)
+COUNTERS = (
+    ('users_follow', 'user_id', 'users_user', 'following_count'),
+    ('users_follow', 'following_id', 'users_user', 'followers_count'),
+    ('recipes_recipe', 'author_id', 'users_user', 'recipes_count'),
+    ('recipes_favoriterecipe', 'recipe_id',
+     'recipes_recipe', 'favorites_count'),
+    ('recipes_recipeingredient', 'ingredient_id',
+     'recipes_ingredient', 'recipes_count'),
+)
+
+# Keeps a counter column in sync with the rows of a related table.
+# Statement-level triggers with transition tables apply one grouped
+# UPDATE per statement, so bulk inserts and deletes stay cheap; updates
+# only count rows whose foreign key actually changed.
+# Arguments: target table, counter column, foreign key column.
+COUNTER_FUNCTION = """
+CREATE OR REPLACE FUNCTION foodgram_update_counter() RETURNS trigger AS $$
+DECLARE
+    target text := TG_ARGV[0];
+    counter text := TG_ARGV[1];
+    fk text := TG_ARGV[2];
+    apply text := 'UPDATE %1$I SET %2$I = GREATEST(%2$I + d.n, 0) FROM (
+        SELECT %3$I AS target_id, %4$s COUNT(*) AS n FROM (%5$s) r
+        GROUP BY %3$I
+    ) d WHERE %1$I.id = d.target_id';
+    moved text := 'SELECT %2$s.%1$I FROM new_rows n JOIN old_rows o
+        USING (id) WHERE n.%1$I IS DISTINCT FROM o.%1$I';
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format(apply, target, counter, fk, '', 'TABLE new_rows');
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format(apply, target, counter, fk, '-', 'TABLE old_rows');
+    ELSE
+        EXECUTE format(apply, target, counter, fk, '', format(moved, fk, 'n'));
+        EXECUTE format(apply, target, counter, fk, '-',
+                       format(moved, fk, 'o'));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def counter_sql(source, fk, target, counter):
+    """
+    Return SQL that backfills ``target.counter`` and creates triggers
+    on ``source``, and SQL that drops them.
+    """
+    name = f'{source}_{counter}'
+    args = f"'{target}', '{counter}', '{fk}'"
+    sql = f"""
+    UPDATE {target} SET {counter} = (
+        SELECT COUNT(*) FROM {source} WHERE {source}.{fk} = {target}.id
+    );
+    CREATE TRIGGER {name}_insert AFTER INSERT ON {source}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_counter({args});
+    CREATE TRIGGER {name}_delete AFTER DELETE ON {source}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_counter({args});
+    CREATE TRIGGER {name}_update AFTER UPDATE ON {source}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_counter({args});
+    """
+    reverse_sql = f"""
+    DROP TRIGGER IF EXISTS {name}_insert ON {source};
+    DROP TRIGGER IF EXISTS {name}_delete ON {source};
+    DROP TRIGGER IF EXISTS {name}_update ON {source};
+    """
+    return sql, reverse_sql
+
+
+class TriggerFieldsMixin:
+    """
+    Keeps ``save()`` of an existing row from writing ``trigger_fields``.
+
+    The in-memory values of columns maintained by triggers are usually
+    stale, so a full save would overwrite the triggers' work. New rows
+    still write them, with their defaults.
+    """
+
+    trigger_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert'):
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                ]
+            update_fields = [field for field in update_fields
+                             if field not in self.trigger_fields]
+        super().save(*args, update_fields=update_fields, **kwargs)
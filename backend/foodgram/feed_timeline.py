@@ -0,0 +1,154 @@
+"""
+Precomputed feeds maintained by PostgreSQL triggers.
+
+Users listed in ``recipes_feedtimeline`` have every recipe of the authors
+they follow copied to ``recipes_feedentry``, so a page of their feed is
+one range of the ``(user, pub_date)`` index however many authors they
+follow. Other users' feeds are read on request, see ``api.feed``.
+
+Rows are added by statement-level triggers when a recipe is published or
+a timeline user follows an author, and removed when they unfollow. A row
+trigger moves the entries of a recipe whose date or author changes, as
+the importer does. Deleted recipes and users take their rows along by
+cascade. The triggers and ``BUILD_LOCK_SQL`` lock the rows of the users
+involved first, so a timeline built while a followed author publishes
+or its owner follows someone waits for that change and includes it.
+"""
+
+# Entries computed from scratch, used by the recount.
+ACTUAL_ENTRIES = """
+    SELECT f.user_id, r.id AS recipe_id, r.pub_date
+    FROM users_follow f
+    JOIN recipes_feedtimeline t USING (user_id)
+    JOIN recipes_recipe r ON r.author_id = f.following_id
+"""
+
+REBUILD_SQL = f"""
+    DELETE FROM recipes_feedentry;
+    INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+    {ACTUAL_ENTRIES};
+"""
+
+# Number of entries missing from or extra in the timelines.
+DRIFT_SQL = f"""
+    SELECT COUNT(*) FROM recipes_feedentry e
+    FULL JOIN ({ACTUAL_ENTRIES}) a USING (user_id, recipe_id)
+    WHERE e.id IS NULL OR a.user_id IS NULL
+       OR e.pub_date IS DISTINCT FROM a.pub_date
+"""
+
+# Locks a user and the authors they follow like the triggers do, so
+# ``BUILD_SQL`` run afterwards sees what they committed meanwhile.
+BUILD_LOCK_SQL = """
+    SELECT id FROM users_user WHERE id = %s OR id IN (
+        SELECT following_id FROM users_follow WHERE user_id = %s
+    ) ORDER BY id FOR NO KEY UPDATE
+"""
+
+# Fills the timeline of one user, whose ``recipes_feedtimeline`` row
+# already exists so the triggers keep it up to date from then on.
+BUILD_SQL = f"""
+    INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+    SELECT * FROM ({ACTUAL_ENTRIES}) a WHERE a.user_id = %s
+    ON CONFLICT (user_id, recipe_id) DO NOTHING
+"""
+
+# Follows are never updated, so only inserts and follow deletions are
+# handled; recipe updates are left to ``FEED_ENTRIES_FUNCTION``. Authors
+# and followers are locked in id order, as the counters lock them too.
+FEED_TIMELINES_FUNCTION = """
+CREATE OR REPLACE FUNCTION foodgram_update_feed_timelines()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'recipes_recipe' THEN
+        PERFORM FROM users_user
+        WHERE id IN (SELECT author_id FROM new_rows)
+        ORDER BY id FOR NO KEY UPDATE;
+        INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+        SELECT f.user_id, r.id, r.pub_date FROM new_rows r
+        JOIN users_follow f ON f.following_id = r.author_id
+        JOIN recipes_feedtimeline t ON t.user_id = f.user_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM FROM users_user WHERE id IN (
+            SELECT user_id FROM new_rows
+            UNION SELECT following_id FROM new_rows
+        ) ORDER BY id FOR NO KEY UPDATE;
+        INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+        SELECT f.user_id, r.id, r.pub_date FROM new_rows f
+        JOIN recipes_feedtimeline t ON t.user_id = f.user_id
+        JOIN recipes_recipe r ON r.author_id = f.following_id
+        ON CONFLICT (user_id, recipe_id) DO NOTHING;
+    ELSE
+        PERFORM FROM users_user WHERE id IN (
+            SELECT user_id FROM old_rows
+            UNION SELECT following_id FROM old_rows
+        ) ORDER BY id FOR NO KEY UPDATE;
+        DELETE FROM recipes_feedentry e USING old_rows f, recipes_recipe r
+        WHERE e.user_id = f.user_id AND r.author_id = f.following_id
+          AND e.recipe_id = r.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Runs for the rare recipes whose date or author actually changes.
+FEED_ENTRIES_FUNCTION = """
+CREATE OR REPLACE FUNCTION foodgram_move_feed_entries() RETURNS trigger AS $$
+BEGIN
+    IF OLD.author_id IS DISTINCT FROM NEW.author_id THEN
+        PERFORM FROM users_user WHERE id = NEW.author_id FOR NO KEY UPDATE;
+        DELETE FROM recipes_feedentry WHERE recipe_id = NEW.id;
+        INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+        SELECT f.user_id, NEW.id, NEW.pub_date FROM users_follow f
+        JOIN recipes_feedtimeline t ON t.user_id = f.user_id
+        WHERE f.following_id = NEW.author_id;
+    ELSE
+        UPDATE recipes_feedentry SET pub_date = NEW.pub_date
+        WHERE recipe_id = NEW.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def feed_timelines_sql():
+    """Return SQL that creates the triggers, and SQL that drops them."""
+    sql = f"""
+    {FEED_TIMELINES_FUNCTION}
+    CREATE TRIGGER recipes_recipe_feed_insert AFTER INSERT ON recipes_recipe
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_feed_timelines();
+    CREATE TRIGGER users_follow_feed_insert AFTER INSERT ON users_follow
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_feed_timelines();
+    CREATE TRIGGER users_follow_feed_delete AFTER DELETE ON users_follow
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_feed_timelines();
+    """
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS recipes_recipe_feed_insert ON recipes_recipe;
+    DROP TRIGGER IF EXISTS users_follow_feed_insert ON users_follow;
+    DROP TRIGGER IF EXISTS users_follow_feed_delete ON users_follow;
+    DROP FUNCTION IF EXISTS foodgram_update_feed_timelines();
+    """
+    return sql, reverse_sql
+
+
+def feed_entries_sql():
+    """Return SQL that creates the recipe update trigger and drops it."""
+    sql = f"""
+    {FEED_ENTRIES_FUNCTION}
+    CREATE TRIGGER recipes_recipe_feed_update
+        AFTER UPDATE OF pub_date, author_id ON recipes_recipe
+        FOR EACH ROW
+        WHEN (OLD.pub_date IS DISTINCT FROM NEW.pub_date
+              OR OLD.author_id IS DISTINCT FROM NEW.author_id)
+        EXECUTE FUNCTION foodgram_move_feed_entries();
+    """
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS recipes_recipe_feed_update ON recipes_recipe;
+    DROP FUNCTION IF EXISTS foodgram_move_feed_entries();
+    """
+    return sql, reverse_sql
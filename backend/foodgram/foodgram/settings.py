@@ -48,9 +48,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
@@ -58,6 +60,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -68,6 +71,36 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request profiling, see ``profiling.ProfilingMiddleware``.
+PROFILING = os.getenv('PROFILING', 'False') == 'True'
+PROFILING_DIR = os.getenv('PROFILING_DIR',
+                          os.path.join(BASE_DIR, 'profiles'))
+# Share of requests run under cProfile, and the latency from which
+# their profiles are kept.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.1))
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', 500))
+
+# Served with ASGI: enables the async read views in ``api.async_views``.
+ASYNC_VIEWS = os.getenv('ASGI', 'False') == 'True'
+
+if PROFILING:
+    MIDDLEWARE.insert(0, 'profiling.ProfilingMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -100,6 +133,73 @@ DATABASES = {
     }
 }
 
+# Cache invalidation moves version keys, so the cache must be shared by
+# every gunicorn worker, the task worker and management commands. The
+# file-based default is shared by all processes of one host (or of the
+# containers mounting the same volume); LocMemCache is per process and
+# only suits a single-process development server.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND',
+                          'django.core.cache.backends.filebased.'
+                          'FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', '/var/tmp/foodgram_cache'),
+    }
+}
+if CACHE_BACKEND.endswith('FileBasedCache'):
+    # The default of 300 entries would keep evicting serialized recipes.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
+
+INGREDIENTS_CACHE_TIMEOUT = int(os.getenv('INGREDIENTS_CACHE_TIMEOUT',
+                                          60 * 60 * 24))
+
+# Serialized recipes are keyed by their modification time, so the
+# timeout only bounds how long unused entries occupy the cache.
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 60 * 60))
+
+# Serve ingredient autocomplete from an in-process sorted index instead
+# of querying the database on every keystroke.
+INGREDIENTS_SEARCH_INDEX = os.getenv('INGREDIENTS_SEARCH_INDEX',
+                                     'True') == 'True'
+
+# Rank recipes by ingredient coverage with an in-process inverted index
+# instead of an aggregate query; the index holds every recipe's
+# ingredient list in each worker.
+RECIPE_INGREDIENT_INDEX = os.getenv('RECIPE_INGREDIENT_INDEX',
+                                    'False') == 'True'
+
+# Users following at least this many authors get a precomputed feed
+# timeline, see ``feed_timeline``; 0 disables timelines.
+FEED_TIMELINE_MIN_FOLLOWING = int(os.getenv('FEED_TIMELINE_MIN_FOLLOWING',
+                                            100))
+
+
+# Run background tasks right in the web process after commit instead of
+# leaving them to ``manage.py run_worker``.
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+
+# Files built by background tasks. Unlike MEDIA_ROOT, nginx does not
+# serve this directory: exports are downloaded through
+# /api/tasks/<id>/download/, which checks the owner.
+EXPORTS_ROOT = os.getenv('EXPORTS_ROOT', os.path.join(BASE_DIR, 'exports'))
+
+# Finished tasks are deleted by the worker after this many days, along
+# with their exports.
+TASKS_RETENTION_DAYS = int(os.getenv('TASKS_RETENTION_DAYS', 7))
+
+# Imported users may come with bcrypt hashes; they are upgraded to the
+# default hasher on the first successful login.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.BCryptPasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -163,6 +263,10 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.Pagination',
+
+    # ``format`` is used by the shopping list download to pick an
+    # export format, not to select a DRF renderer.
+    'URL_FORMAT_OVERRIDE': None,
 }
 
 DJOSER = {
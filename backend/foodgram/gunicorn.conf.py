@@ -0,0 +1,37 @@
+"""
+Gunicorn settings, read from the working directory on start.
+
+With ``ASGI=True`` the project is served by uvicorn workers and the
+async read views are enabled (see ``api.async_views``), otherwise by
+the synchronous WSGI workers.
+
+Workers keep Prometheus metrics in files so ``/metrics`` can report the
+totals of all of them, see ``metrics``.
+"""
+import multiprocessing
+import os
+import shutil
+
+# Must be set before prometheus_client is imported.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics')
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS',
+                        multiprocessing.cpu_count() * 2 + 1))
+if os.getenv('ASGI', 'False') == 'True':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def on_starting(server):
+    """Drop the samples of a previous run."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
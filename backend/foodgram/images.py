@@ -0,0 +1,130 @@
+"""
+Processing of uploaded pictures.
+
+Uploads are decoded once, checked against the size limits, downscaled
+and re-encoded; a small thumbnail is stored next to every picture.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from constants import (IMAGE_FORMAT, IMAGE_MAX_PIXELS, IMAGE_QUALITY,
+                       THUMBNAIL_SIDE)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+logger = logging.getLogger(__name__)
+
+
+class ImageTooLarge(ValueError):
+    """The picture exceeds ``IMAGE_MAX_PIXELS``."""
+
+
+def process_image(data, max_side):
+    """
+    Return ``data`` downscaled to ``max_side`` and re-encoded.
+
+    Raises ``OSError`` for data Pillow cannot read and ``ImageTooLarge``
+    for pictures with too many pixels; the size is checked before the
+    pixels are decoded.
+    """
+    with open_image(BytesIO(data)) as image:
+        width, height = image.size
+        if width * height > IMAGE_MAX_PIXELS:
+            raise ImageTooLarge
+        image.draft('RGB', (max_side, max_side))
+        return encode(resize(image, max_side))
+
+
+def open_image(file):
+    """
+    ``Image.open`` raising ``ImageTooLarge`` instead of Pillow's
+    ``DecompressionBombError``, which is not an ``OSError``.
+    """
+    try:
+        return Image.open(file)
+    except Image.DecompressionBombError:
+        raise ImageTooLarge
+
+
+def make_thumbnail(file):
+    """Return a thumbnail of an image file."""
+    with open_image(file) as image:
+        image.draft('RGB', (THUMBNAIL_SIDE, THUMBNAIL_SIDE))
+        return encode(resize(image, THUMBNAIL_SIDE))
+
+
+def resize(image, max_side):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def encode(image):
+    buffer = BytesIO()
+    if IMAGE_FORMAT == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=IMAGE_QUALITY,
+                                  optimize=True, progressive=True)
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if 'transparency' in image.info
+                or image.mode in ('LA', 'PA') else 'RGB')
+        image.save(buffer, IMAGE_FORMAT, quality=IMAGE_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def image_name(stem):
+    return f'{stem}.{EXTENSIONS[IMAGE_FORMAT]}'
+
+
+def thumbnail_name(name):
+    """``recipes/abc.webp`` -> ``recipes/thumbs/abc.webp``."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'thumbs', image_name(stem))
+
+
+def thumbnail_outdated(instance, source, target):
+    image = getattr(instance, source)
+    expected = thumbnail_name(image.name) if image else ''
+    return getattr(instance, target).name != expected
+
+
+def update_thumbnail(instance, source, target):
+    """
+    Bring the ``target`` thumbnail of ``instance`` in line with the
+    ``source`` image. Returns True if anything was changed.
+
+    The row is updated with ``QuerySet.update``, so no signals are sent;
+    ``updated_at`` is moved to change cached representations.
+    """
+    if not thumbnail_outdated(instance, source, target):
+        return False
+    image = getattr(instance, source)
+    thumbnail = getattr(instance, target)
+    expected = thumbnail_name(image.name) if image else ''
+
+    storage = thumbnail.storage
+    if image:
+        try:
+            with image.open('rb'):
+                content = ContentFile(make_thumbnail(image))
+        except (OSError, ValueError) as e:
+            logger.warning('Не удалось создать миниатюру %s: %s',
+                           image.name, e)
+            return False
+        if storage.exists(expected):
+            storage.delete(expected)
+        expected = storage.save(expected, content)
+    if thumbnail:
+        storage.delete(thumbnail.name)
+    setattr(instance, target, expected)
+    type(instance).objects.filter(pk=instance.pk).update(
+        **{target: expected, 'updated_at': timezone.now()}
+    )
+    return True
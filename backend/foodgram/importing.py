@@ -0,0 +1,57 @@
+"""Helpers shared by the data import management commands."""
+import json
+from itertools import islice
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = ' \t\n\r,'
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the items of a top-level JSON array one by one.
+
+    The file is read in chunks, so memory use depends on the size of the
+    largest item rather than on the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{path}: ожидался JSON-массив.')
+        pos, eof, ahead = 1, False, chunk_size
+        while True:
+            if not eof and len(buffer) - pos < ahead:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+            while pos < len(buffer) and buffer[pos] in SEPARATORS:
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError(f'{path}: неожиданный конец файла.')
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = len(buffer)
+            if not eof and (end == len(buffer)
+                            or buffer[end] not in SEPARATORS + ']'):
+                # The item may continue in the next chunk: a number cut
+                # at ``1.`` or ``1e`` decodes as ``1`` followed by junk.
+                ahead = len(buffer) - pos + chunk_size
+                continue
+            ahead = chunk_size
+            pos = end
+            yield item
+
+
+def batched(iterable, size):
+    """Split ``iterable`` into lists of at most ``size`` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,141 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Under gunicorn every worker writes its samples to files in
+``PROMETHEUS_MULTIPROC_DIR`` (see ``gunicorn.conf.py``) and the view
+merges them, so any worker reports the totals of all of them. Without
+the variable, e.g. with ``runserver``, metrics are kept in memory.
+
+The endpoint is not proxied by nginx and is meant to be scraped from
+the internal network.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from profiling import endpoint_name
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ('endpoint', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Количество SQL-запросов за запрос',
+    ('endpoint',),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшу',
+    ('cache', 'result'),
+)
+MUTATIONS = Counter(
+    'foodgram_mutations',
+    'Добавления и удаления избранного, списка покупок и подписок',
+    ('model', 'action'),
+)
+
+
+def record_cache(cache, hits, misses):
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def record_mutation(model, action):
+    """Count an ``add`` or ``remove`` of a user relation ``model``."""
+    MUTATIONS.labels(model._meta.model_name, action).inc()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+# Counter of the request being handled; async views run their queries
+# in a thread, which sees the same context.
+request_queries = ContextVar('request_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = request_queries.get()
+    if counter is not None:
+        counter.count += 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class MetricsMiddleware:
+    """Observe the latency and SQL query count of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            counter = self.stop(token)
+        self.observe(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        started, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            counter = self.stop(token)
+        self.observe(request, response, started, counter)
+        return response
+
+    @staticmethod
+    def start():
+        return time.perf_counter(), request_queries.set(QueryCounter())
+
+    @staticmethod
+    def stop(token):
+        counter = request_queries.get()
+        request_queries.reset(token)
+        return counter
+
+    @staticmethod
+    def observe(request, response, started, counter):
+        endpoint = endpoint_name(request)
+        REQUEST_LATENCY.labels(
+            endpoint, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        REQUEST_QUERIES.labels(endpoint).observe(counter.count)
+
+
+def metrics_view(request):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,155 @@
+"""
+Opt-in request profiling, enabled with ``PROFILING=True``.
+
+``ProfilingMiddleware`` measures the number and time of SQL queries,
+the time spent building serializer data and the total latency of every
+request. The numbers are returned in the ``Server-Timing`` header and
+logged as a JSON line by the ``profiling`` logger. A sample of requests
+runs under cProfile; dumps of requests slower than ``PROFILING_SLOW_MS``
+are kept in ``PROFILING_DIR`` and summarized by ``profile_summary``.
+
+Queries run while a streaming response is iterated are not counted.
+The middleware is synchronous, so under ASGI async views run in a thread
+while it is enabled.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+# Statistics of the request being handled in the current thread.
+current_stats = ContextVar('current_stats', default=None)
+
+serializer_data = BaseSerializer.data
+
+
+class RequestStats:
+    """Counters of a single request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """Database ``execute_wrapper`` counting queries and their time."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@property
+def timed_data(self):
+    """``BaseSerializer.data`` which adds its time to the request stats."""
+    stats = current_stats.get()
+    # Nested serializers are part of the outermost one's time.
+    if stats is None or stats.serializing:
+        return serializer_data.fget(self)
+    stats.serializing = True
+    started = time.perf_counter()
+    try:
+        return serializer_data.fget(self)
+    finally:
+        stats.serializer_time += time.perf_counter() - started
+        stats.serializing = False
+
+
+def endpoint_name(request):
+    """``RecipeViewSet.list`` style name of the view which served a request."""
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view = match.func
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class',
+                                                       None)
+    if view_class is None:
+        return view.__name__
+    method = request.method.lower()
+    actions = getattr(view, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class ProfilingMiddleware:
+    """Collect timings of every request, see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Serializers of all views are timed through their ``data``.
+        BaseSerializer.data = timed_data
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        profiler = self.start_profiler()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(stats.execute))
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            current_stats.reset(token)
+        total = (time.perf_counter() - started) * 1000
+
+        endpoint = endpoint_name(request)
+        sql_time = stats.sql_time * 1000
+        serializer_time = stats.serializer_time * 1000
+        response['Server-Timing'] = (
+            f'db;dur={sql_time:.1f};desc="{stats.queries} queries", '
+            f'serializer;dur={serializer_time:.1f}, total;dur={total:.1f}'
+        )
+        profile = None
+        if profiler is not None and total >= settings.PROFILING_SLOW_MS:
+            profile = self.dump(profiler, endpoint, total)
+        logger.info(json.dumps({
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 1),
+            'sql_ms': round(sql_time, 1),
+            'sql_queries': stats.queries,
+            'serializer_ms': round(serializer_time, 1),
+            'profile': profile,
+        }))
+        return response
+
+    @staticmethod
+    def start_profiler():
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread.
+            return None
+        return profiler
+
+    @staticmethod
+    def dump(profiler, endpoint, total):
+        """Save the profile as ``<endpoint>.<time>.<total>ms.prof``."""
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.PROFILING_DIR,
+            f'{endpoint}.{time.time_ns()}.{round(total)}ms.prof',
+        )
+        profiler.dump_stats(path)
+        return path
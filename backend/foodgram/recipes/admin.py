@@ -1,5 +1,6 @@
 from django.contrib import admin
-from django.db.models import Count, OuterRef
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Aggregate, FloatField
 from django.utils.safestring import mark_safe
 from django.contrib.admin import SimpleListFilter
 
@@ -40,9 +41,9 @@ class HasRecipesFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == 'yes':
-            return queryset.filter(recipe__isnull=False).distinct()
+            return queryset.filter(recipes_count__gt=0)
         if self.value() == 'no':
-            return queryset.filter(recipe__isnull=True)
+            return queryset.filter(recipes_count=0)
         return queryset
 
 
@@ -65,13 +66,23 @@ class IngredientAdmin(admin.ModelAdmin):
         'measurement_unit'
     )
     list_filter = ('measurement_unit', HasRecipesFilter)
+    readonly_fields = ('recipes_count',)
     search_help_text = 'Доступен поиск по названию ингредиента'
     actions_on_bottom = True
 
-    @admin.display(ordering='recipes_ingredient',
+    @admin.display(ordering='recipes_count',
                    description='Рецептов')
     def recipes_count(self, ingredient):
-        return ingredient.recipes.count()
+        return ingredient.recipes_count
+
+
+class Tertiles(Aggregate):
+    """Boundaries between the lower, middle and upper thirds."""
+
+    function = 'percentile_cont'
+    template = ('%(function)s(ARRAY[1.0 / 3, 2.0 / 3]) '
+                'WITHIN GROUP (ORDER BY %(expressions)s)')
+    output_field = ArrayField(FloatField())
 
 
 class CookingTimeFilter(SimpleListFilter):
@@ -79,13 +90,14 @@ class CookingTimeFilter(SimpleListFilter):
     parameter_name = 'cooking_time_group'
 
     def lookups(self, request, model_admin):
-        qs = model_admin.get_queryset(request)
-        times = list(qs.values_list('cooking_time', flat=True).distinct())
-        if len(times) < 3:
+        # Tertiles of the recipes, computed by the database.
+        tertiles = model_admin.get_queryset(request).aggregate(
+            tertiles=Tertiles('cooking_time'))['tertiles']
+        if tertiles is None:
+            return []
+        n, m = (round(value) for value in tertiles)
+        if n >= m:
             return []
-        times.sort()
-        n = times[len(times) // 3]
-        m = times[(2 * len(times)) // 3]
         return [
             (f'lt{n}', f'быстрее {n} мин'),
             (f'range{n}_{m}', f'от {n} до {m} мин'),
@@ -149,20 +161,12 @@ class RecipeAdmin(admin.ModelAdmin):
 
     search_help_text = 'Доступен поиск по названию или автору рецепта'
 
-    def get_queryset(self, request):
-        return Recipe.objects.annotate(
-            favorite_count=Count(
-                FavoriteRecipe.objects.filter(
-                    recipe=OuterRef('pk')).values('id')
-            )
-        )
-
     @admin.display(
-        ordering='favorite_count',
-        description='Рецептов.',
+        ordering='favorites_count',
+        description='В избранном',
     )
     def favorite_count(self, recipe):
-        return recipe.favorite_count
+        return recipe.favorites_count
 
     @admin.display(ordering='Ingredients',
                    description='Продукты')
@@ -179,6 +183,7 @@ class RecipeAdmin(admin.ModelAdmin):
                    description='Изображение')
     @mark_safe
     def show_image(self, recipe):
-        if recipe.image:
-            return f'<img src="{recipe.image.url}" width="100" height="100">'
+        image = recipe.thumbnail or recipe.image
+        if image:
+            return f'<img src="{image.url}" width="100" height="100">'
         return '—'
@@ -1,24 +1,204 @@
-import json
+import csv
+import io
 import os
-from django.core.management.base import BaseCommand
+import time
+
 from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
+
+from api.cache import invalidate_ingredients
+from api.conditional import touch_ingredient_recipes
+from importing import batched, iter_json_array
 from recipes.models import Ingredient
 
+FIELDS = ('name', 'measurement_unit')
+# Placeholder id of ingredients inserted during the current run.
+NEW = 0
+# Prefix of names held while renaming; imported names are stripped, so
+# they never start with a space.
+TEMPORARY_NAME = ' '
+
+
+def iter_csv_rows(path):
+    """
+    Yield ingredients from a CSV file.
+
+    A header row naming the columns is optional; without it the columns
+    are ``name, measurement_unit``.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        if 'name' in first:
+            header = first
+        else:
+            header = FIELDS
+            yield dict(zip(header, first))
+        for row in reader:
+            if row:
+                yield dict(zip(header, row))
+
 
 class Command(BaseCommand):
-    help = 'Импортирует ингредиенты  из JSON файлов'
+    help = ('Синхронизирует справочник продуктов с JSON или CSV файлом: '
+            'добавляет новые и обновляет изменившиеся записи')
+
+    INGREDIENTS_FILE = os.path.join(settings.BASE_DIR, 'data',
+                                    'ingredients.json')
 
-    INGREDIENTS_FILE = os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=self.INGREDIENTS_FILE,
+                            help='Путь к файлу .json или .csv')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество записей в одном запросе')
+        parser.add_argument('--copy', action='store_true',
+                            help='Добавлять записи через COPY, быстрее '
+                                 'при первичной загрузке')
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        path = options['file']
+        started = time.perf_counter()
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0,
+                      'skipped': 0}
+        self.write_time = 0
         try:
-            with open(self.INGREDIENTS_FILE, 'r', encoding='utf-8') as f:
-                ingredients = [Ingredient(**data) for data in json.load(f)]
-                inserted_ingredients = Ingredient.objects.bulk_create(ingredients,
-                                                                      ignore_conflicts=True)
-                self.stdout.write(self.style.SUCCESS(f'Импорт продуктов завершён. '
-                                                     f'Загружено {len(inserted_ingredients)} элементов.'))
-
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Ошибка загрузки продуктов '
-                                               f'из файла {self.INGREDIENTS_FILE}: {e}'))
+            with transaction.atomic():
+                self.load_existing()
+                loaded = time.perf_counter()
+                self.sync(self.read_rows(path), options['batch_size'],
+                          options['copy'])
+        except (OSError, ValueError, csv.Error) as e:
+            self.stdout.write(self.style.ERROR(
+                f'Ошибка загрузки продуктов из файла {path}: {e}'))
+            return
+        invalidate_ingredients()
+
+        total = time.perf_counter() - started
+        stats = self.stats
+        self.stdout.write(self.style.SUCCESS(
+            f'Синхронизация продуктов завершена: добавлено '
+            f'{stats["inserted"]}, обновлено {stats["updated"]}, без '
+            f'изменений {stats["unchanged"]}, пропущено {stats["skipped"]}.'
+        ))
+        self.stdout.write(
+            f'Чтение справочника {loaded - started:.2f} с, запись '
+            f'{self.write_time:.2f} с, всего {total:.2f} с.'
+        )
+
+    @staticmethod
+    def read_rows(path):
+        if path.lower().endswith('.csv'):
+            return iter_csv_rows(path)
+        return iter_json_array(path)
+
+    def load_existing(self):
+        """Read the whole catalogue with a single query."""
+        self.by_key = {}
+        self.by_id = {}
+        self.explicit_ids = False
+        for pk, name, unit in Ingredient.objects.values_list(
+                'id', *FIELDS).order_by():
+            self.by_key[name, unit] = pk
+            self.by_id[pk] = (name, unit)
+
+    def sync(self, rows, batch_size, use_copy):
+        for batch in batched(rows, batch_size):
+            to_insert, to_update = [], []
+            for row in batch:
+                self.classify(row, to_insert, to_update)
+            started = time.perf_counter()
+            if to_insert:
+                if use_copy:
+                    self.copy(to_insert)
+                else:
+                    Ingredient.objects.bulk_create(to_insert)
+            if to_update:
+                # A batch may hand a name over from one ingredient to
+                # another, and the unique key is checked row by row.
+                Ingredient.objects.filter(
+                    pk__in=[item.id for item in to_update],
+                ).update(name=Concat(Value(TEMPORARY_NAME), 'id',
+                                     output_field=CharField()))
+                Ingredient.objects.bulk_update(to_update, FIELDS)
+            touch_ingredient_recipes([item.id for item in to_update])
+            self.write_time += time.perf_counter() - started
+        if self.explicit_ids:
+            self.reset_sequence()
+
+    def classify(self, row, to_insert, to_update):
+        """Sort a row into new, changed or unchanged ingredients."""
+        name = str(row.get('name') or '').strip()
+        unit = str(row.get('measurement_unit') or '').strip()
+        pk = int(row['id']) if row.get('id') else None
+        if not (name and unit):
+            self.stdout.write(self.style.WARNING(
+                f'Пропущена запись без названия или единицы: {row}'))
+            self.stats['skipped'] += 1
+            return
+
+        # Rows without an id are identified by the unique key, rows with
+        # an id may also rename an existing ingredient.
+        key = (name, unit)
+        owner = self.by_key.get(key)
+        if owner is not None and (pk is None or owner == pk):
+            self.stats['unchanged'] += 1
+            return
+        if owner is not None:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущена запись {row}: продукт с таким названием и '
+                f'единицей уже есть.'))
+            self.stats['skipped'] += 1
+            return
+
+        ingredient = Ingredient(id=pk, name=name, measurement_unit=unit)
+        if pk in self.by_id:
+            del self.by_key[self.by_id[pk]]
+            to_update.append(ingredient)
+            self.stats['updated'] += 1
+        else:
+            to_insert.append(ingredient)
+            self.stats['inserted'] += 1
+        if pk is None:
+            self.by_key[key] = NEW
+        else:
+            self.by_key[key] = pk
+            self.by_id[pk] = key
+            self.explicit_ids = True
+
+    @staticmethod
+    def copy(ingredients):
+        """Insert ``ingredients`` with PostgreSQL ``COPY``."""
+        with_id = [item for item in ingredients if item.id is not None]
+        without_id = [item for item in ingredients if item.id is None]
+        for group, columns in (
+            (with_id, ('id', *FIELDS, 'recipes_count')),
+            (without_id, (*FIELDS, 'recipes_count')),
+        ):
+            if not group:
+                continue
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for ingredient in group:
+                writer.writerow(
+                    [getattr(ingredient, column) for column in columns])
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {Ingredient._meta.db_table} '
+                    f'({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+
+    @staticmethod
+    def reset_sequence():
+        """Move the id sequence past ids taken from the file."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                         [Ingredient]):
+                cursor.execute(sql)
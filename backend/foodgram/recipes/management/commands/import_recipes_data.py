@@ -1,9 +1,17 @@
-import json
 import os
 import shutil
-from django.core.management.base import BaseCommand
-from django.utils.dateparse import parse_datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.cache import invalidate_recipe_ingredients
+from importing import batched, iter_json_array
 from recipes.models import Ingredient, Recipe, RecipeIngredient
 from users.models import User
 
@@ -12,81 +20,150 @@ class Command(BaseCommand):
     help = 'Импортирует рецепты и связи RecipeIngredient из JSON файлов'
 
     RECIPES_FILE = os.path.join(settings.BASE_DIR, 'data', 'recipes.json')
-    RECIPE_INGREDIENTS_FILE = os.path.join(settings.BASE_DIR, 'data', 'recipe_ingredients.json')
+    RECIPE_INGREDIENTS_FILE = os.path.join(settings.BASE_DIR, 'data',
+                                           'recipe_ingredients.json')
     PHOTOS_SRC_DIR = os.path.join(settings.BASE_DIR, 'data', 'recipes_photo')
     PHOTOS_DST_DIR = os.path.join(settings.MEDIA_ROOT, 'recipes')
 
-    def handle(self, *args, **kwargs):
-        self.import_recipes()
-        self.import_recipe_ingredients()
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество записей в одном INSERT')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Потоков для копирования изображений')
 
-    def import_recipes(self):
-        os.makedirs(self.PHOTOS_DST_DIR, exist_ok=True)
-        copied = 0
-        for filename in os.listdir(self.PHOTOS_SRC_DIR):
-            src_path = os.path.join(self.PHOTOS_SRC_DIR, filename)
-            dst_path = os.path.join(self.PHOTOS_DST_DIR, filename)
-            if os.path.isfile(src_path):
-                shutil.copy(src_path, dst_path)
-                copied += 1
-        self.stdout.write(self.style.SUCCESS(f'Скопировано {copied} изображений.'))
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.copy_photos(options['workers'])
 
+        # Everything is replaced in one transaction, so a broken file
+        # leaves the previous data in place.
         try:
-            with open(self.RECIPES_FILE, 'r', encoding='utf-8') as f:
-                recipes_data = json.load(f)
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Ошибка загрузки рецептов: {e}'))
-            return
-
-        Recipe.objects.all().delete()
-        self.stdout.write(self.style.WARNING('Все рецепты удалены перед импортом.'))
-
-        for item in recipes_data:
-            try:
-                author = User.objects.get(id=item.get('author'))
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'Автор id={item.get("author")} не найден.'))
-                continue
+            with transaction.atomic():
+                Recipe.objects.all().delete()
+                self.stdout.write(self.style.WARNING(
+                    'Все рецепты удалены перед импортом.'))
+                recipes = self.import_recipes(options['batch_size'])
+                links = self.import_recipe_ingredients(options['batch_size'])
+                self.reset_sequences()
+        except (OSError, ValueError, IntegrityError) as e:
+            raise CommandError(f'Ошибка импорта, изменения отменены: {e}')
+        invalidate_recipe_ingredients()
 
-            pub_date = parse_datetime(item.get('pub_date')) if item.get('pub_date') else None
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {recipes}, связей RecipeIngredient: '
+            f'{links} за {elapsed:.2f} с '
+            f'({(recipes + links) / elapsed:.0f} записей/с).'
+        ))
 
-            recipe, created = Recipe.objects.update_or_create(
-                id=item.get('id'),
-                defaults={
-                    'author': author,
-                    'name': item.get('name'),
-                    'image': item.get('image'),
-                    'text': item.get('text'),
-                    'cooking_time': item.get('cooking_time'),
-                    'pub_date': pub_date
-                }
+    def copy_photos(self, workers):
+        os.makedirs(self.PHOTOS_DST_DIR, exist_ok=True)
+        sources = [
+            path for path in (
+                os.path.join(self.PHOTOS_SRC_DIR, filename)
+                for filename in os.listdir(self.PHOTOS_SRC_DIR)
             )
-            self.stdout.write(self.style.SUCCESS(f'Рецепт "{recipe.name}" {"создан" if created else "обновлён"}'))
+            if os.path.isfile(path)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            copied = len(list(
+                executor.map(shutil.copy, sources,
+                             [self.PHOTOS_DST_DIR] * len(sources))
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Скопировано {copied} изображений.'))
 
-        self.stdout.write(self.style.SUCCESS('Импорт рецептов завершён.'))
+    def import_recipes(self, batch_size):
+        author_ids = set(User.objects.values_list('id', flat=True))
+        default_tz = timezone.get_default_timezone()
+        created = 0
+        for batch in batched(iter_json_array(self.RECIPES_FILE), batch_size):
+            recipes = []
+            for item in batch:
+                if item.get('author') not in author_ids:
+                    self.stdout.write(self.style.WARNING(
+                        f'Автор id={item.get("author")} не найден.'))
+                    continue
+                pub_date = (parse_datetime(item['pub_date'])
+                            if item.get('pub_date') else None)
+                if pub_date and timezone.is_naive(pub_date):
+                    pub_date = timezone.make_aware(pub_date, default_tz)
+                recipes.append((Recipe(
+                    id=item.get('id'),
+                    author_id=item['author'],
+                    name=item.get('name'),
+                    image=item.get('image'),
+                    text=item.get('text'),
+                    cooking_time=item.get('cooking_time'),
+                ), pub_date))
 
-    def import_recipe_ingredients(self):
-        try:
-            with open(self.RECIPE_INGREDIENTS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Ошибка загрузки RecipeIngredient: {e}'))
-            return
+            self.bulk_create(
+                [recipe for recipe, _ in recipes],
+                lambda recipe: f'рецепт id={recipe.id} «{recipe.name}»')
+            # ``auto_now_add`` overwrites pub_date on insert, so dates from
+            # the file are written with a separate UPDATE.
+            dated = []
+            for recipe, pub_date in recipes:
+                if pub_date:
+                    recipe.pub_date = pub_date
+                    dated.append(recipe)
+            Recipe.objects.bulk_update(dated, ['pub_date'])
+            created += len(recipes)
+        return created
 
-        RecipeIngredient.objects.all().delete()
-        self.stdout.write(self.style.WARNING('Все RecipeIngredient удалены перед импортом.'))
+    def import_recipe_ingredients(self, batch_size):
+        recipe_ids = set(Recipe.objects.values_list('id', flat=True))
+        ingredient_ids = set(Ingredient.objects.values_list('id', flat=True))
+        created = 0
+        for batch in batched(iter_json_array(self.RECIPE_INGREDIENTS_FILE),
+                             batch_size):
+            links = []
+            for item in batch:
+                if (item.get('recipe') not in recipe_ids
+                        or item.get('ingredient') not in ingredient_ids):
+                    self.stdout.write(self.style.WARNING(
+                        f'Пропущена запись: рецепт={item.get("recipe")}, '
+                        f'ингредиент={item.get("ingredient")}'))
+                    continue
+                links.append(RecipeIngredient(
+                    recipe_id=item['recipe'],
+                    ingredient_id=item['ingredient'],
+                    amount=item['amount'],
+                ))
+            self.bulk_create(
+                links, lambda link: f'связь рецепт={link.recipe_id}, '
+                                    f'ингредиент={link.ingredient_id}')
+            created += len(links)
+        return created
 
-        for item in data:
-            try:
-                recipe = Recipe.objects.get(id=item['recipe'])
-                ingredient = Ingredient.objects.get(id=item['ingredient'])
-                RecipeIngredient.objects.create(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=item['amount']
-                )
-            except (Recipe.DoesNotExist, Ingredient.DoesNotExist):
-                self.stdout.write(self.style.WARNING(
-                    f'Пропущена запись: рецепт={item.get("recipe")}, ингредиент={item.get("ingredient")}'))
+    @staticmethod
+    def bulk_create(objects, describe):
+        """
+        Insert ``objects`` of one model, naming the first one that breaks
+        a constraint in the error.
+        """
+        if not objects:
+            return
+        model = type(objects[0])
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+        except IntegrityError:
+            # Only a failed batch is inserted row by row to find the row.
+            for obj in objects:
+                try:
+                    with transaction.atomic():
+                        model.objects.bulk_create([obj])
+                except IntegrityError as e:
+                    raise CommandError(
+                        f'Ошибка импорта, изменения отменены: '
+                        f'{describe(obj)} нарушает ограничение базы '
+                        f'данных: {e}') from e
+            raise
 
-        self.stdout.write(self.style.SUCCESS('Импорт RecipeIngredient завершён.'))
+    def reset_sequences(self):
+        """Move the id sequence past the ids taken from the file."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                         [Recipe]):
+                cursor.execute(sql)
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+import cart_totals
+import feed_timeline
+import search_vectors
+from counters import COUNTERS
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики (избранное, '
+            'подписки, рецепты, использование продуктов), суммы списков '
+            'покупок, ленты подписок, поисковые векторы рецептов и '
+            'исправляет расхождения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только показать расхождения, '
+                                 'ничего не исправляя')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for source, fk, target, counter in COUNTERS:
+                actual = (f'SELECT t.id, COUNT(s.{fk}) AS n FROM {target} t '
+                          f'LEFT JOIN {source} s ON s.{fk} = t.id '
+                          f'GROUP BY t.id')
+                if options['check']:
+                    cursor.execute(
+                        f'SELECT COUNT(*) FROM {target} JOIN ({actual}) d '
+                        f'ON {target}.id = d.id WHERE {counter} <> d.n'
+                    )
+                    drifted = cursor.fetchone()[0]
+                else:
+                    cursor.execute(
+                        f'UPDATE {target} SET {counter} = d.n '
+                        f'FROM ({actual}) d '
+                        f'WHERE {target}.id = d.id AND {counter} <> d.n'
+                    )
+                    drifted = cursor.rowcount
+                total += drifted
+                style = self.style.WARNING if drifted else self.style.SUCCESS
+                self.stdout.write(style(f'{target}.{counter}: '
+                                        f'расхождений {drifted}'))
+
+            for module, title in ((cart_totals, 'Суммы списков покупок'),
+                                  (feed_timeline, 'Ленты подписок'),
+                                  (search_vectors, 'Поисковые векторы')):
+                cursor.execute(module.DRIFT_SQL)
+                drifted = cursor.fetchone()[0]
+                if drifted and not options['check']:
+                    cursor.execute(module.REBUILD_SQL)
+                total += drifted
+                style = self.style.WARNING if drifted else self.style.SUCCESS
+                self.stdout.write(style(f'{title}: расхождений {drifted}'))
+
+        action = 'Найдено' if options['check'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {total} расхождений за '
+            f'{time.perf_counter() - started:.2f} с.'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+from counters import counter_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_lower_idx'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunSQL(*counter_sql('recipes_favoriterecipe', 'recipe_id',
+                                       'recipes_recipe', 'favorites_count')),
+        migrations.RunSQL(*counter_sql('recipes_recipeingredient',
+                                       'ingredient_id', 'recipes_ingredient',
+                                       'recipes_count')),
+        migrations.RunSQL(*counter_sql('recipes_recipe', 'author_id',
+                                       'users_user', 'recipes_count')),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from feed_timeline import feed_entries_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_alter_recipeingredient_options'),
+    ]
+
+    operations = [
+        migrations.RunSQL(*feed_entries_sql()),
+        # Dates of recipes imported before the trigger existed.
+        migrations.RunSQL(
+            """
+            UPDATE recipes_feedentry e SET pub_date = r.pub_date
+            FROM recipes_recipe r
+            WHERE r.id = e.recipe_id AND e.pub_date <> r.pub_date
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from cart_totals import CART_TOTALS_FUNCTION, REBUILD_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_feed_entry_updates'),
+    ]
+
+    operations = [
+        # Totals are rebuilt because they are no longer clamped at zero,
+        # so drift left by the previous function would fail on delete.
+        migrations.RunSQL(CART_TOTALS_FUNCTION + REBUILD_SQL,
+                          migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from feed_timeline import FEED_ENTRIES_FUNCTION, FEED_TIMELINES_FUNCTION
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_cart_totals_locks'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FEED_TIMELINES_FUNCTION + FEED_ENTRIES_FUNCTION,
+                          migrations.RunSQL.noop),
+    ]
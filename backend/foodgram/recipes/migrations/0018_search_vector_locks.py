@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from search_vectors import REBUILD_SQL, SEARCH_VECTORS_FUNCTIONS
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_feed_timeline_locks'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SEARCH_VECTORS_FUNCTIONS + REBUILD_SQL,
+                          migrations.RunSQL.noop),
+    ]
@@ -1,18 +1,30 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import MinValueValidator
 
 from constants import INGREDIENT_NAME_LEN, UNIT_LEN, RECIPE_LEN
+from counters import TriggerFieldsMixin
 from users.models import User
 
 
-class Ingredient(models.Model):
+class Ingredient(TriggerFieldsMixin, models.Model):
     """Model for ingredient."""
 
+    trigger_fields = ('recipes_count',)
+
     name = models.CharField(max_length=INGREDIENT_NAME_LEN,
                             verbose_name='Название')
     measurement_unit = models.CharField(max_length=UNIT_LEN,
                                         verbose_name='Единица измерения')
+    # Maintained by database triggers, see the counters migrations.
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Продукт'
@@ -22,14 +34,23 @@ class Ingredient(models.Model):
             models.UniqueConstraint(fields=['name', 'measurement_unit'],
                                     name='unique_ingredient')
         ]
+        indexes = [
+            # lower(name) is text, hence text_pattern_ops: lets
+            # ``lower(name) LIKE 'prefix%'`` use the index under any
+            # collation.
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'),
+                         name='ingredient_name_lower_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(TriggerFieldsMixin, models.Model):
     """Model for recipe."""
 
+    trigger_fields = ('favorites_count', 'search_vector')
+
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -38,6 +59,9 @@ class Recipe(models.Model):
     name = models.CharField(max_length=RECIPE_LEN,
                             verbose_name='Название рецепта')
     image = models.ImageField(upload_to='recipes/', verbose_name='Картинка')
+    # Generated from ``image``, see ``images.update_thumbnail``.
+    thumbnail = models.ImageField(upload_to='recipes/thumbs/', blank=True,
+                                  editable=False, verbose_name='Миниатюра')
     text = models.TextField(verbose_name='Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -46,19 +70,40 @@ class Recipe(models.Model):
     )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления (в минутах)',
-        validators=[MinValueValidator(1)])
+        validators=[MinValueValidator(1)],
+        db_index=True)
 
     pub_date = models.DateTimeField(
         verbose_name='Дата добавления',
         auto_now_add=True,
         db_index=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+    # Maintained by database triggers, see the counters migrations.
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    # Maintained by database triggers, see ``search_vectors``.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         default_related_name = 'recipes'
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            # Newest recipes of an author, read per followed author by
+            # the feed, see ``api.feed``.
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+            GinIndex(fields=['search_vector'],
+                     name='recipe_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,8 +112,10 @@ class Recipe(models.Model):
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
                                related_name='recipe_ingredients')
+    # Indexed by ``recipe_ingredient_lookup_idx``.
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE,
-                                   related_name='ingredient_recipes')
+                                   related_name='ingredient_recipes',
+                                   db_index=False)
     amount = models.PositiveSmallIntegerField(
         verbose_name='Количество',
         validators=[MinValueValidator(1)])
@@ -80,19 +127,117 @@ class RecipeIngredient(models.Model):
             models.UniqueConstraint(fields=['recipe', 'ingredient'],
                                     name='unique_recipe_ingredient')
         ]
+        indexes = [
+            # Recipes containing given ingredients, read index-only by
+            # the coverage ranking, see ``api.coverage``.
+            models.Index(fields=['ingredient', 'recipe'],
+                         name='recipe_ingredient_lookup_idx'),
+        ]
 
     def __str__(self):
         return (f'{self.ingredient.name} — {self.amount} '
                 f'({self.ingredient.measurement_unit})')
 
 
+class CartIngredient(models.Model):
+    """Total amount of an ingredient in a user's shopping cart."""
+
+    # Maintained by database triggers, see ``cart_totals``.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Продукт'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+    recipes_count = models.PositiveIntegerField(verbose_name='Рецептов')
+
+    class Meta:
+        default_related_name = 'cart_ingredients'
+        verbose_name = 'Продукт в списке покупок'
+        verbose_name_plural = 'Продукты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_cart_ingredient')
+        ]
+        indexes = [
+            # Lets the triggers find totals which dropped to zero.
+            models.Index(fields=['id'], condition=models.Q(recipes_count=0),
+                         name='cart_ingredient_empty_idx'),
+        ]
+
+    def __str__(self):
+        return (f'{self.ingredient.name} — {self.amount} '
+                f'({self.ingredient.measurement_unit}) у {self.user}')
+
+
+class FeedTimeline(models.Model):
+    """Marks a user whose feed is precomputed in ``FeedEntry``."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_timeline',
+        verbose_name='Пользователь'
+    )
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Лента'
+        verbose_name_plural = 'Ленты'
+
+    def __str__(self):
+        return f'Лента пользователя {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Recipe of a followed author in a precomputed feed."""
+
+    # Maintained by database triggers, see ``feed_timeline``.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    # Copy of ``Recipe.pub_date``, so a page is read from one index.
+    pub_date = models.DateTimeField(verbose_name='Дата добавления')
+
+    class Meta:
+        default_related_name = 'feed_entries'
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Рецепты в лентах'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_entry_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте у {self.user}'
+
+
 class UserAndRecipe(models.Model):
     """Special base model which contains user and recipe."""
 
+    # Indexed by the ``(user, recipe)`` unique constraint.
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        verbose_name='Пользователь'
+        verbose_name='Пользователь',
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
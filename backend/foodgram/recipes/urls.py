@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import recipe_link
+from .views import async_recipe_link, recipe_link
 
 app_name = 'recipes'
 
 urlpatterns = [
-    path('recipes/<int:recipe_id>/', recipe_link, name='get_recipe_link'),
+    path('recipes/<int:recipe_id>/',
+         async_recipe_link if settings.ASYNC_VIEWS else recipe_link,
+         name='get_recipe_link'),
 ]
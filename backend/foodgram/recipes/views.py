@@ -9,3 +9,11 @@ def recipe_link(request, recipe_id):
     if not exists:
         raise Http404(f"Рецепт {recipe_id} не найден")
     return redirect(f'/recipes/{recipe_id}')
+
+
+async def async_recipe_link(request, recipe_id):
+    """``recipe_link`` for ASGI deployments, see ``ASYNC_VIEWS``."""
+    exists = await Recipe.objects.filter(pk=recipe_id).aexists()
+    if not exists:
+        raise Http404(f"Рецепт {recipe_id} не найден")
+    return redirect(f'/recipes/{recipe_id}')
@@ -0,0 +1,117 @@
+"""
+Full-text search vectors of recipes maintained by PostgreSQL triggers.
+
+``recipes_recipe.search_vector`` combines the recipe name (weight A),
+its ingredient names (B) and description (C) under the ``russian``
+configuration and is searched through a GIN index, see
+``RecipeFilter.filter_search``.
+
+A row trigger computes the vector when a recipe is created or its name
+or description change. Statement-level triggers recompute the recipes
+whose ingredients are added, removed or renamed. Before recomputing
+they lock the rows of those recipes, and an added ingredient's row
+against renames, so of two transactions changing the same recipe or
+ingredient concurrently the later one sees the other's changes.
+"""
+
+CONFIG = 'russian'
+
+# Vectors computed from scratch for recipes ``r``.
+VECTOR = f"""
+    setweight(to_tsvector('{CONFIG}', r.name), 'A')
+    || setweight(to_tsvector('{CONFIG}', coalesce((
+        SELECT string_agg(i.name, ' ') FROM recipes_recipeingredient ri
+        JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id), '')), 'B')
+    || setweight(to_tsvector('{CONFIG}', r.text), 'C')
+"""
+
+REBUILD_SQL = f"""
+    UPDATE recipes_recipe r SET search_vector = {VECTOR}
+    WHERE r.search_vector IS DISTINCT FROM {VECTOR};
+"""
+
+# Number of recipes whose vector differs from the actual one.
+DRIFT_SQL = f"""
+    SELECT COUNT(*) FROM recipes_recipe r
+    WHERE r.search_vector IS DISTINCT FROM {VECTOR}
+"""
+
+# The updates below set only ``search_vector``, so they do not fire the
+# recipe trigger, which watches ``name`` and ``text``.
+SEARCH_VECTORS_FUNCTIONS = f"""
+CREATE OR REPLACE FUNCTION foodgram_set_search_vector() RETURNS trigger AS $$
+BEGIN
+    SELECT {VECTOR} INTO NEW.search_vector
+    FROM (SELECT NEW.id, NEW.name, NEW.text) r (id, name, text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION foodgram_update_search_vectors()
+RETURNS trigger AS $$
+DECLARE
+    changed text := CASE TG_TABLE_NAME
+        WHEN 'recipes_ingredient' THEN 'SELECT ri.recipe_id
+            FROM old_rows o JOIN new_rows n USING (id)
+            JOIN recipes_recipeingredient ri ON ri.ingredient_id = n.id
+            WHERE o.name IS DISTINCT FROM n.name'
+        WHEN 'recipes_recipeingredient' THEN CASE TG_OP
+            WHEN 'INSERT' THEN 'SELECT recipe_id FROM new_rows'
+            WHEN 'DELETE' THEN 'SELECT recipe_id FROM old_rows'
+            ELSE 'SELECT recipe_id FROM old_rows
+                UNION SELECT recipe_id FROM new_rows' END
+        END;
+BEGIN
+    IF TG_TABLE_NAME = 'recipes_recipeingredient' AND TG_OP <> 'DELETE' THEN
+        PERFORM FROM recipes_ingredient
+        WHERE id IN (SELECT ingredient_id FROM new_rows)
+        ORDER BY id FOR SHARE;
+    END IF;
+    EXECUTE format('SELECT id FROM recipes_recipe WHERE id IN (%s)
+        ORDER BY id FOR NO KEY UPDATE', changed);
+    EXECUTE format('UPDATE recipes_recipe r SET search_vector = %s
+        WHERE r.id IN (%s)', $v${VECTOR}$v$, changed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def search_vectors_sql():
+    """
+    Return SQL that creates the triggers and fills the vectors, and SQL
+    that drops the triggers.
+    """
+    sql = [SEARCH_VECTORS_FUNCTIONS, """
+    CREATE TRIGGER recipes_recipe_search_vector
+        BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+        FOR EACH ROW EXECUTE FUNCTION foodgram_set_search_vector();
+    CREATE TRIGGER recipes_ingredient_search_vectors
+        AFTER UPDATE ON recipes_ingredient
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION foodgram_update_search_vectors();
+    """, REBUILD_SQL]
+    reverse_sql = ["""
+    DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe;
+    DROP TRIGGER IF EXISTS recipes_ingredient_search_vectors
+        ON recipes_ingredient;
+    """]
+    source = 'recipes_recipeingredient'
+    for operation, tables in (
+        ('insert', 'NEW TABLE AS new_rows'),
+        ('delete', 'OLD TABLE AS old_rows'),
+        ('update', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ):
+        name = f'{source}_search_vectors_{operation}'
+        sql.append(f"""
+        CREATE TRIGGER {name} AFTER {operation.upper()} ON {source}
+            REFERENCING {tables} FOR EACH STATEMENT
+            EXECUTE FUNCTION foodgram_update_search_vectors();
+        """)
+        reverse_sql.append(f'DROP TRIGGER IF EXISTS {name} ON {source};')
+    reverse_sql.append("""
+    DROP FUNCTION IF EXISTS foodgram_set_search_vector();
+    DROP FUNCTION IF EXISTS foodgram_update_search_vectors();
+    """)
+    return '\n'.join(sql), '\n'.join(reverse_sql)
@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Administration panel for background tasks."""
+
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'attempts',
+        'user',
+        'created_at',
+        'duration',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('created_at', 'started_at', 'heartbeat_at',
+                       'finished_at', 'duration', 'result', 'error')
+    list_select_related = ('user',)
@@ -0,0 +1,92 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from tasks.models import Task
+from tasks.queue import (HEARTBEAT_INTERVAL, claim, delete_finished,
+                         execute, heartbeat, requeue_stale)
+
+# Seconds between deletions of old finished tasks.
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Сколько задач выполнять одновременно')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза между проверками пустой очереди, с')
+        parser.add_argument('--stale-timeout', type=int,
+                            default=HEARTBEAT_INTERVAL * 6,
+                            help='Через сколько секунд без продления '
+                                 'выполняющаяся задача считается '
+                                 'брошенной и возвращается в очередь')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        concurrency = max(options['concurrency'], 1)
+        self.stdout.write(f'Обработчик запущен, потоков: {concurrency}.')
+
+        running = {}
+        renewed = cleaned = float('-inf')
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while not self.stopping:
+                running = {future: task for future, task in running.items()
+                           if not future.done()}
+                now = time.monotonic()
+                if running and now - renewed >= HEARTBEAT_INTERVAL:
+                    heartbeat(running.values())
+                    renewed = now
+                if now - cleaned >= CLEANUP_INTERVAL:
+                    delete_finished(settings.TASKS_RETENTION_DAYS)
+                    cleaned = now
+                requeue_stale(options['stale_timeout'])
+                free = concurrency - len(running)
+                tasks = claim(free) if free else []
+                for task in tasks:
+                    running[executor.submit(self.run_task, task)] = task
+                close_old_connections()
+                if tasks:
+                    continue
+                if options['once'] and not running:
+                    break
+                if running:
+                    wait(running, timeout=options['poll_interval'],
+                         return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options['poll_interval'])
+        self.stdout.write('Обработчик остановлен.')
+
+    def stop(self, signum, frame):
+        # Running tasks are finished, new ones are not claimed.
+        self.stopping = True
+
+    def run_task(self, task):
+        try:
+            finished = execute(task)
+        finally:
+            connection.close()
+        if finished is None:
+            self.stdout.write(self.style.WARNING(
+                f'{task}: аренда истекла, результат отброшен '
+                f'(попытка {task.attempts}).'
+            ))
+            return
+        style = {
+            Task.DONE: self.style.SUCCESS,
+            Task.PENDING: self.style.WARNING,
+        }.get(task.status, self.style.ERROR)
+        self.stdout.write(style(
+            f'{task}: {task.get_status_display().lower()} '
+            f'за {task.duration:.0f} мс (попытка {task.attempts}).'
+        ))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Aggregate, Avg, Count, FloatField, Max, Q
+
+from tasks.models import Task
+
+
+class Percentile(Aggregate):
+    """PostgreSQL ``percentile_cont`` ordered-set aggregate."""
+
+    function = 'percentile_cont'
+    template = ('%(function)s(%(fraction)s) '
+                'WITHIN GROUP (ORDER BY %(expressions)s)')
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=fraction, **extra)
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику фоновых задач: количество и время'
+
+    def handle(self, *args, **options):
+        done = Q(status=Task.DONE)
+        rows = (
+            Task.objects.values('name')
+            .annotate(
+                total=Count('id'),
+                pending=Count('id', filter=Q(status=Task.PENDING)),
+                failed=Count('id', filter=Q(status=Task.FAILED)),
+                avg=Avg('duration', filter=done),
+                p95=Percentile('duration', 0.95, filter=done),
+                max=Max('duration', filter=done),
+            )
+            .order_by('name')
+        )
+        self.stdout.write(
+            f'{"задача":<40}{"всего":>8}{"ждут":>8}{"ошибок":>8}'
+            f'{"сред. мс":>10}{"p95 мс":>10}{"макс. мс":>10}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:<40}{row["total"]:>8}{row["pending"]:>8}'
+                f'{row["failed"]:>8}{row["avg"] or 0:>10.0f}'
+                f'{row["p95"] or 0:>10.0f}{row["max"] or 0:>10.0f}'
+            )
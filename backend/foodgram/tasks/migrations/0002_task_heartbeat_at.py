@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Продлена'),
+        ),
+        # Tasks running during the upgrade keep the lease they had.
+        migrations.RunSQL(
+            "UPDATE tasks_task SET heartbeat_at = started_at "
+            "WHERE status = 'running'",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='timeout',
+            field=models.PositiveIntegerField(default=600, verbose_name='Ограничение времени, с'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A function call stored for a worker, see ``tasks.queue``."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=255)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tasks',
+        verbose_name='Пользователь',
+    )
+    status = models.CharField('Статус', max_length=16, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток',
+                                                    default=3)
+    # A task running longer is treated like one whose lease expired.
+    timeout = models.PositiveIntegerField('Ограничение времени, с',
+                                          default=10 * 60)
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    started_at = models.DateTimeField('Начата', null=True, blank=True)
+    # Renewed by the worker while the task runs; a task whose lease
+    # expired belongs to a worker that died.
+    heartbeat_at = models.DateTimeField('Продлена', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+    duration = models.FloatField('Длительность, мс', null=True, blank=True)
+    result = models.JSONField('Результат', null=True, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('-created_at',)
+        indexes = [
+            # Workers only ever look for due pending tasks.
+            models.Index(fields=['run_at'],
+                         condition=models.Q(status='pending'),
+                         name='task_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,156 @@
+"""
+Database-backed task queue.
+
+Functions decorated with ``@task`` get a ``delay()`` method which stores
+the call in the ``Task`` table, and the ``run_worker`` command executes
+stored calls. A task is created in the caller's transaction, so workers
+never see tasks whose data was rolled back. Arguments and results must
+be JSON-serializable.
+
+A worker holds a lease on each task it runs and renews it with
+``heartbeat()``. Tasks whose lease expired, or which run longer than
+their ``timeout``, are returned to the queue by ``requeue_stale()``, or
+fail once they are out of attempts. A thread cannot be stopped, so a
+hung task keeps its worker thread busy, but its late outcome is dropped
+because the task no longer holds the lease.
+
+With ``TASKS_EAGER`` tasks run in the calling process right after the
+transaction commits, which is handy when no worker is running.
+"""
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+# Delay before the first retry; it doubles with every attempt.
+RETRY_DELAY = 10
+
+# Seconds between lease renewals of running tasks.
+HEARTBEAT_INTERVAL = 10
+
+STALE_ERROR = 'Обработчик задачи перестал отвечать.'
+TIMEOUT_ERROR = 'Задача выполнялась дольше отведённого времени.'
+
+
+def task(max_attempts=3, timeout=10 * 60):
+    """
+    Register a function as a task with a ``delay()`` method. A call may
+    run for up to ``timeout`` seconds.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(*args, user=None):
+            return enqueue(name, args, user=user, max_attempts=max_attempts,
+                           timeout=timeout)
+
+        func.task_name = name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), user=None, max_attempts=3, timeout=10 * 60):
+    task = Task.objects.create(name=name, args=list(args), user=user,
+                               max_attempts=max_attempts, timeout=timeout)
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: execute(start(task)))
+    return task
+
+
+def start(task):
+    now = timezone.now()
+    Task.objects.filter(pk=task.pk).update(
+        status=Task.RUNNING, started_at=now, heartbeat_at=now,
+        attempts=F('attempts') + 1,
+    )
+    task.status = Task.RUNNING
+    task.attempts += 1
+    return task
+
+
+def claim(limit):
+    """Mark up to ``limit`` due tasks as running and return them."""
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.PENDING, run_at__lte=timezone.now())
+            .order_by('run_at', 'id')[:limit]
+        )
+        return [start(task) for task in tasks]
+
+
+def heartbeat(tasks):
+    """Renew the lease on running ``tasks``."""
+    return Task.objects.filter(
+        pk__in=[task.pk for task in tasks], status=Task.RUNNING,
+    ).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale(timeout):
+    """
+    Return tasks whose lease was not renewed for ``timeout`` seconds, or
+    which run longer than their own timeout, to the queue, or fail them
+    if they are out of attempts.
+    """
+    now = timezone.now()
+    running = Task.objects.filter(status=Task.RUNNING)
+    requeued = 0
+    for expired, error in (
+        (running.filter(
+            heartbeat_at__lt=now - timedelta(seconds=timeout)), STALE_ERROR),
+        (running.filter(
+            started_at__lt=now - F('timeout') * timedelta(seconds=1)),
+         TIMEOUT_ERROR),
+    ):
+        expired.filter(attempts__gte=F('max_attempts')).update(
+            status=Task.FAILED, error=error, finished_at=now,
+        )
+        requeued += expired.update(status=Task.PENDING, error=error)
+    return requeued
+
+
+def delete_finished(days):
+    """Delete tasks that finished more than ``days`` days ago."""
+    return Task.objects.filter(
+        status__in=(Task.DONE, Task.FAILED),
+        finished_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
+
+
+def execute(task):
+    """
+    Run a started task and record the outcome and its duration. Return
+    the task, or ``None`` if it lost its lease meanwhile and the outcome
+    was dropped.
+    """
+    started = time.perf_counter()
+    try:
+        task.result = import_string(task.name)(*task.args)
+    except Exception as e:
+        task.error = ''.join(traceback.format_exception(e))
+        if task.attempts < task.max_attempts:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (task.attempts - 1))
+        else:
+            task.status = Task.FAILED
+    else:
+        task.status = Task.DONE
+        task.error = ''
+    task.duration = (time.perf_counter() - started) * 1000
+    task.finished_at = timezone.now()
+    if not Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, attempts=task.attempts,
+    ).update(status=task.status, run_at=task.run_at, result=task.result,
+             error=task.error, duration=task.duration,
+             finished_at=task.finished_at):
+        return None
+    return task
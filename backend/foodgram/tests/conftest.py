@@ -0,0 +1,76 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.EXPORTS_ROOT = str(tmp_path / 'exports')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='user', email='user@example.com', password='password',
+        first_name='Имя', last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='password',
+        first_name='Автор', last_name='Рецептов',
+    )
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def ingredients():
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'продукт {i}', measurement_unit='г')
+        for i in range(5)
+    )
+
+
+@pytest.fixture
+def make_recipes(ingredients):
+    """Create ``count`` recipes of ``author`` with every ingredient."""
+
+    def make_recipes(author, count, **fields):
+        recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {i}', image='recipes/test.jpg',
+                text='Описание', cooking_time=10, **fields,
+            )
+            for i in range(count)
+        ]
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes
+            for ingredient in ingredients
+        )
+        return recipes
+
+    return make_recipes
@@ -0,0 +1,54 @@
+"""
+Query budgets of the API endpoints.
+
+The endpoints are measured once on the synthetic dataset of
+``benchmark_api`` and their query counts are compared with
+``data/api_budget.json``. Time and memory depend on the machine, so
+they are only checked by the command itself.
+"""
+import json
+import random
+
+import pytest
+from django.core.management import load_command_class
+from django.db import transaction
+from django.test.utils import override_settings
+
+from api.cache import invalidate_ingredients, invalidate_recipe_ingredients
+
+command = load_command_class('api', 'benchmark_api')
+
+with open(command.BUDGET_FILE, encoding='utf-8') as budget_file:
+    BUDGET = json.load(budget_file)
+
+
+@pytest.fixture(scope='module')
+def results(django_db_setup, django_db_blocker):
+    options = vars(command.create_parser('manage.py', 'benchmark_api')
+                   .parse_args([]))
+    random.seed(options['seed'])
+    with django_db_blocker.unblock():
+        # Seeded once for the module and rolled back afterwards.
+        with transaction.atomic():
+            viewer, ids = command.seed(options)
+            invalidate_ingredients()
+            invalidate_recipe_ingredients()
+            with override_settings(ALLOWED_HOSTS=['*']):
+                results = command.measure(viewer, ids, options['repeat'])
+            transaction.set_rollback(True)
+        invalidate_ingredients()
+        invalidate_recipe_ingredients()
+    return results
+
+
+def test_every_endpoint_has_budget():
+    names = {name for name, _ in command.ENDPOINTS}
+    assert names == set(BUDGET)
+
+
+@pytest.mark.parametrize('name', sorted(BUDGET))
+def test_endpoint_within_query_budget(results, name):
+    assert results[name]['queries'] <= BUDGET[name]['queries'], (
+        f"{name}: queries = {results[name]['queries']} > "
+        f"{BUDGET[name]['queries']}"
+    )
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.authtoken.models import Token
+
+from api.async_views import (async_read, ingredient_list, recipe_detail,
+                             recipe_list)
+from api.viewsets import IngredientViewSet, RecipeViewSet
+from recipes.views import async_recipe_link, recipe_link
+
+pytestmark = pytest.mark.django_db
+
+VIEWS = {
+    'recipes': async_read(recipe_list, RecipeViewSet.as_view(
+        {'get': 'list', 'post': 'create'})),
+    'recipe': async_read(recipe_detail, RecipeViewSet.as_view(
+        {'get': 'retrieve'})),
+    'ingredients': async_read(ingredient_list, IngredientViewSet.as_view(
+        {'get': 'list'})),
+}
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user).key
+
+
+@pytest.fixture
+def compare(rf, api_client):
+    """Compare a response of an async view with that of the viewset."""
+
+    def compare(view, url, token=None, **kwargs):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        response = async_to_sync(VIEWS[view])(
+            rf.get(url, headers=headers), **kwargs)
+        expected = api_client.get(url, headers=headers)
+        assert response.status_code == expected.status_code
+        assert json.loads(response.content or 'null') == (
+            json.loads(expected.content or 'null'))
+        return response
+
+    return compare
+
+
+@pytest.mark.parametrize('query', ['', '?limit=2&page=2',
+                                   '?pagination=cursor&limit=2',
+                                   '?page=99', '?cooking_time_min=x'])
+def test_recipe_list(author, make_recipes, token, compare, query):
+    make_recipes(author, 5)
+
+    compare('recipes', f'/api/recipes/{query}')
+    compare('recipes', f'/api/recipes/{query}', token)
+
+
+def test_recipe_list_rejects_unknown_token(compare):
+    response = compare('recipes', '/api/recipes/', 'unknown')
+
+    assert response.status_code == 401
+
+
+def test_recipe_detail(author, make_recipes, token, compare):
+    recipe, = make_recipes(author, 1)
+
+    compare('recipe', f'/api/recipes/{recipe.pk}/', pk=recipe.pk)
+    compare('recipe', f'/api/recipes/{recipe.pk}/', token, pk=recipe.pk)
+    response = compare('recipe', '/api/recipes/0/', pk=0)
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('query', ['', '?name=прод&limit=2', '?limit=0'])
+def test_ingredient_list(ingredients, compare, query):
+    compare('ingredients', f'/api/ingredients/{query}')
+
+
+def test_not_modified(ingredients, rf):
+    response = async_to_sync(VIEWS['ingredients'])(
+        rf.get('/api/ingredients/'))
+
+    response = async_to_sync(VIEWS['ingredients'])(rf.get(
+        '/api/ingredients/', headers={'If-None-Match': response['ETag']}))
+
+    assert response.status_code == 304
+
+
+def test_recipe_link(author, make_recipes, rf):
+    recipe, = make_recipes(author, 1)
+
+    response = async_to_sync(async_recipe_link)(rf.get('/'), recipe.pk)
+
+    assert response.status_code == 302
+    assert response.url == recipe_link(rf.get('/'), recipe.pk).url
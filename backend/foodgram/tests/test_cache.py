@@ -0,0 +1,21 @@
+import time
+
+from api.cache import (get_ingredients_version,
+                       get_recipe_ingredients_version, invalidate_ingredients)
+
+
+def test_versions_do_not_expire(monkeypatch):
+    versions = get_ingredients_version(), get_recipe_ingredients_version()
+    year_later = time.time() + 60 * 60 * 24 * 365
+    monkeypatch.setattr(time, 'time', lambda: year_later)
+
+    assert (get_ingredients_version(),
+            get_recipe_ingredients_version()) == versions
+
+
+def test_invalidation_changes_version():
+    version = get_ingredients_version()
+
+    invalidate_ingredients()
+
+    assert get_ingredients_version() != version
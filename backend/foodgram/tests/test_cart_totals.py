@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from recipes.models import (CartIngredient, Ingredient, RecipeIngredient,
+                            ShoppingList)
+
+pytestmark = pytest.mark.django_db
+
+
+def cart_totals(user):
+    return dict(CartIngredient.objects.filter(user=user)
+                .values_list('ingredient', 'amount'))
+
+
+def actual_totals(user):
+    return dict(
+        RecipeIngredient.objects.filter(recipe__shopping_cart__user=user)
+        .values('ingredient').annotate(total=Sum('amount'))
+        .values_list('ingredient', 'total')
+    )
+
+
+@pytest.fixture
+def recipes(author, make_recipes):
+    return make_recipes(author, 2)
+
+
+def test_cart_add_and_remove(user, recipes):
+    first, second = recipes
+    ShoppingList.objects.create(user=user, recipe=first)
+    ShoppingList.objects.create(user=user, recipe=second)
+    assert set(cart_totals(user).values()) == {2}
+    assert cart_totals(user) == actual_totals(user)
+
+    ShoppingList.objects.filter(user=user, recipe=first).delete()
+    assert cart_totals(user) == actual_totals(user)
+
+    ShoppingList.objects.filter(user=user).delete()
+    assert not CartIngredient.objects.exists()
+
+
+def test_recipe_edit(user, recipes, ingredients):
+    first, second = recipes
+    ShoppingList.objects.create(user=user, recipe=first)
+    ShoppingList.objects.create(user=user, recipe=second)
+
+    RecipeIngredient.objects.filter(recipe=first).update(amount=3)
+    RecipeIngredient.objects.filter(recipe=second,
+                                    ingredient=ingredients[0]).delete()
+    RecipeIngredient.objects.create(
+        recipe=second, amount=7,
+        ingredient=Ingredient.objects.create(name='соль',
+                                             measurement_unit='г'))
+
+    assert cart_totals(user) == actual_totals(user)
+    first.delete()
+    assert cart_totals(user) == actual_totals(user)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('cart_first', [False, True])
+def test_concurrent_cart_entry_and_ingredient(user, author, make_recipes,
+                                              cart_first):
+    """Each change is made in its own transaction while the other's is open."""
+    recipe, = make_recipes(author, 1)
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def add_to_cart():
+        ShoppingList.objects.create(user=user, recipe=recipe)
+
+    def add_ingredient():
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                        amount=5)
+
+    first, second = ((add_to_cart, add_ingredient) if cart_first
+                     else (add_ingredient, add_to_cart))
+    done = threading.Event()
+
+    def run_first():
+        try:
+            with transaction.atomic():
+                first()
+                done.set()
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    done.wait()
+    with transaction.atomic():
+        second()
+    thread.join()
+
+    assert cart_totals(user) == actual_totals(user)
+    assert cart_totals(user)[salt.pk] == 5
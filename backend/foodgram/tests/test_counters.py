@@ -0,0 +1,72 @@
+import pytest
+from django.contrib import admin
+from django.test import Client
+
+from recipes.models import FavoriteRecipe, Ingredient, Recipe
+from users.models import Follow, User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_recipe_save_keeps_favorites_count(user, author, make_recipes):
+    recipe, = make_recipes(author, 1)
+    stale = Recipe.objects.get(pk=recipe.pk)
+    FavoriteRecipe.objects.create(user=user, recipe=recipe)
+
+    stale.name = 'Новое название'
+    stale.save()
+
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.favorites_count == 1
+
+
+def test_user_save_keeps_counters(user, author, make_recipes):
+    stale = User.objects.get(pk=author.pk)
+    make_recipes(author, 2)
+    Follow.objects.create(user=user, following=author)
+
+    stale.first_name = 'Другое'
+    stale.save()
+
+    author.refresh_from_db()
+    assert author.first_name == 'Другое'
+    assert (author.recipes_count, author.followers_count) == (2, 1)
+
+
+def test_new_rows_are_inserted(author, ingredients):
+    recipe = Recipe(author=author, name='Рецепт', image='recipes/test.jpg',
+                    text='Описание', cooking_time=5)
+    recipe.save()
+
+    assert Recipe.objects.filter(pk=recipe.pk, favorites_count=0).exists()
+
+
+def test_admin_change_form_keeps_recipes_count(author, ingredients,
+                                               make_recipes):
+    make_recipes(author, 3)
+    ingredient = ingredients[0]
+    superuser = User.objects.create_superuser(
+        username='admin', email='admin@example.com', password='password')
+    client = Client()
+    client.force_login(superuser)
+
+    response = client.post(
+        f'/admin/recipes/ingredient/{ingredient.pk}/change/',
+        {'name': 'новое имя', 'measurement_unit': 'кг'},
+    )
+
+    assert response.status_code == 302
+    ingredient.refresh_from_db()
+    assert ingredient.name == 'новое имя'
+    assert ingredient.recipes_count == 3
+
+
+@pytest.mark.parametrize('model, fields', [
+    (Ingredient, {'recipes_count'}),
+    (User, {'recipes_count', 'followers_count', 'following_count'}),
+])
+def test_counters_read_only_in_admin(rf, model, fields):
+    model_admin = admin.site._registry[model]
+
+    assert fields <= set(model_admin.get_readonly_fields(rf.get('/')))
@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.feed import build_timeline
+from recipes.models import FeedEntry, FeedTimeline, Recipe
+from tasks.models import Task
+from tasks.queue import execute, start
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def timeline_threshold(settings):
+    settings.FEED_TIMELINE_MIN_FOLLOWING = 1
+
+
+def feed_ids(client):
+    response = client.get('/api/recipes/feed/')
+    assert response.status_code == 200
+    return [item['id'] for item in response.data['results']]
+
+
+def test_feed_read_does_not_write(user, author, user_client, make_recipes):
+    recipes = make_recipes(author, 3)
+    Follow.objects.bulk_create([Follow(user=user, following=author)])
+
+    with CaptureQueriesContext(connection) as queries:
+        ids = feed_ids(user_client)
+
+    assert ids == [recipe.id for recipe in reversed(recipes)]
+    assert not FeedTimeline.objects.exists()
+    assert not [query for query in queries.captured_queries
+                if not query['sql'].lstrip().startswith('SELECT')]
+
+
+def test_follow_builds_timeline_in_background(user, author, user_client,
+                                              make_recipes):
+    recipes = make_recipes(author, 3)
+
+    response = user_client.post(f'/api/users/{author.pk}/subscribe/')
+
+    assert response.status_code == 201
+    task = Task.objects.get(name='api.tasks.build_feed_timeline')
+    assert not FeedTimeline.objects.exists()
+    execute(start(task))
+    assert FeedEntry.objects.filter(user=user).count() == 3
+    assert feed_ids(user_client) == [recipe.id for recipe in reversed(recipes)]
+
+
+def test_updated_dates_move_feed_entries(user, author, user_client,
+                                        make_recipes):
+    first, second = make_recipes(author, 2)
+    Follow.objects.create(user=user, following=author)
+    build_timeline(user.pk)
+
+    # The importer sets imported dates with ``bulk_update``.
+    first.pub_date = second.pub_date + timedelta(days=1)
+    Recipe.objects.bulk_update([first], ['pub_date'])
+
+    assert FeedEntry.objects.get(recipe=first).pub_date == first.pub_date
+    assert feed_ids(user_client) == [first.id, second.id]
+
+
+def test_new_author_moves_feed_entries(user, author, django_user_model,
+                                       make_recipes):
+    recipe, = make_recipes(author, 1)
+    other = django_user_model.objects.create_user(
+        username='other', email='other@example.com', password='password')
+    Follow.objects.create(user=user, following=other)
+    build_timeline(user.pk)
+    assert not FeedEntry.objects.exists()
+
+    Recipe.objects.filter(pk=recipe.pk).update(author=other)
+
+    assert list(FeedEntry.objects.values_list('user', 'recipe')) == [
+        (user.pk, recipe.pk)]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('build_first', [False, True])
+def test_timeline_built_while_author_publishes(user, author, build_first):
+    """Each change is made in its own transaction while the other's is open."""
+    Follow.objects.create(user=user, following=author)
+
+    def publish():
+        Recipe.objects.create(author=author, name='Рецепт',
+                              image='recipes/test.jpg', text='Описание',
+                              cooking_time=10)
+
+    def build():
+        build_timeline(user.pk)
+
+    first, second = (build, publish) if build_first else (publish, build)
+    done = threading.Event()
+
+    def run_first():
+        try:
+            with transaction.atomic():
+                first()
+                done.set()
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    done.wait()
+    second()
+    thread.join()
+
+    assert list(FeedEntry.objects.values_list('user', 'recipe')) == [
+        (user.pk, Recipe.objects.get().pk)]
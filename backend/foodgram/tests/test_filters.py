@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+
+from api.filters import RecipeFilter
+from recipes.models import FavoriteRecipe, Recipe, ShoppingList
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users(django_user_model):
+    return django_user_model.objects.bulk_create(
+        django_user_model(username=f'user{i}', email=f'user{i}@example.com')
+        for i in range(50)
+    )
+
+
+@pytest.fixture
+def recipes(author):
+    return Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {i}', image='recipes/test.jpg',
+               text='Описание', cooking_time=10)
+        for i in range(200)
+    )
+
+
+@pytest.mark.parametrize('model, param', [
+    (FavoriteRecipe, 'is_favorited'),
+    (ShoppingList, 'is_in_shopping_cart'),
+])
+@pytest.mark.parametrize('value', ['1', '0'])
+def test_filter_reads_user_recipe_index(rf, users, recipes, model, param,
+                                        value):
+    model.objects.bulk_create(
+        model(user=user, recipe=recipes[(i * 7 + j) % len(recipes)])
+        for i, user in enumerate(users)
+        for j in range(20)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {model._meta.db_table}')
+    request = rf.get('/api/recipes/')
+    request.user = users[0]
+
+    queryset = RecipeFilter({param: value}, queryset=Recipe.objects.all(),
+                            request=request).qs
+
+    expected = set(model.objects.filter(user=users[0])
+                   .values_list('recipe', flat=True))
+    ids = set(queryset.values_list('id', flat=True))
+    if value == '1':
+        assert ids == expected
+    else:
+        assert ids == {recipe.id for recipe in recipes} - expected
+    plan = queryset.explain()
+    assert f'{model._meta.model_name}_user_recipe_unique' in plan, plan
+
+
+@pytest.mark.parametrize('value', ['1.5', 'x', '1,2.5'])
+def test_ingredients_filter_rejects_non_integers(api_client, value):
+    response = api_client.get(f'/api/recipes/?ingredients={value}')
+
+    assert response.status_code == 400
+    assert 'ingredients' in response.data
+
+
+def test_ingredients_filter_accepts_ids(author, api_client, make_recipes,
+                                        ingredients):
+    recipe, = make_recipes(author, 1)
+
+    response = api_client.get(
+        f'/api/recipes/?ingredients={ingredients[0].pk},{ingredients[1].pk}')
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [recipe.pk]
@@ -0,0 +1,73 @@
+import base64
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from api.fields import ProcessedImageField
+
+pytestmark = pytest.mark.django_db
+
+AVATAR_URL = '/api/users/me/avatar/'
+
+
+def png_header(width, height):
+    """A PNG declaring ``width`` x ``height`` pixels without any data."""
+
+    def chunk(kind, data):
+        crc = zlib.crc32(kind + data)
+        return struct.pack('>I', len(data)) + kind + data + struct.pack(
+            '>I', crc)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IEND', b''))
+
+
+def data_uri(data, kind='png'):
+    return f'data:image/{kind};base64,{base64.b64encode(data).decode()}'
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('width, height', [
+    # Above Pillow's own limit, which raises DecompressionBombError.
+    (100_000, 100_000),
+    # Above IMAGE_MAX_PIXELS only.
+    (8_000, 8_000),
+])
+def test_too_many_pixels_rejected_from_header(user_client, width, height):
+    data = png_header(width, height)
+    assert len(data) < 100
+
+    response = user_client.put(AVATAR_URL, {'avatar': data_uri(data)},
+                               format='json')
+
+    assert response.status_code == 400
+    assert response.data['avatar'] == [
+        ProcessedImageField.TOO_MANY_PIXELS_MESSAGE]
+
+
+def test_invalid_image_rejected(user_client):
+    response = user_client.put(AVATAR_URL,
+                               {'avatar': data_uri(b'not an image')},
+                               format='json')
+
+    assert response.status_code == 400
+
+
+def test_image_downscaled(user, user_client):
+    response = user_client.put(AVATAR_URL,
+                               {'avatar': data_uri(png(3000, 1500))},
+                               format='json')
+
+    assert response.status_code == 200
+    user.refresh_from_db()
+    with Image.open(user.avatar) as image:
+        assert max(image.size) <= 1600
@@ -0,0 +1,126 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+
+from importing import iter_json_array
+from recipes.management.commands import import_recipes_data
+from recipes.models import Ingredient, Recipe
+from users.management.commands import import_users
+
+ITEMS = [
+    658095, 15000000000.0, -0.5, 1e-7, 2.5E+10, 0, True, False, None,
+    'строка', 'кавычки " и \\\\ обратная косая', 'юникод é☃',
+    {'name': 'Мука', 'amount': 1.25, 'nested': [1, 2.0, {'x': 'y'}]},
+    [], {}, [[1e3]],
+]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', range(1, 12))
+def test_items_split_across_chunks(tmp_path, chunk_size, indent):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(ITEMS, indent=indent), encoding='utf-8')
+
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ITEMS
+
+
+def test_escapes_split_across_chunks(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(ITEMS, ensure_ascii=True), encoding='utf-8')
+
+    for chunk_size in range(1, 12):
+        assert list(iter_json_array(path, chunk_size=chunk_size)) == ITEMS
+
+
+def test_reported_case(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text('[658095, 15000000000.0]', encoding='utf-8')
+
+    assert list(iter_json_array(path, chunk_size=7)) == [658095,
+                                                          15000000000.0]
+
+
+@pytest.mark.parametrize('content', ['{"a": 1}', '[1, 2', '[1, 2x]'])
+def test_invalid_input(tmp_path, content):
+    path = tmp_path / 'data.json'
+    path.write_text(content, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(path, chunk_size=3))
+
+
+@pytest.mark.django_db
+def test_import_users_counts_inserted_rows(tmp_path, monkeypatch,
+                                           django_user_model):
+    path = tmp_path / 'users.json'
+    path.write_text(json.dumps([
+        {'username': name, 'email': f'{name}@example.com',
+         'password': make_password('password')}
+        for name in ('first', 'second')
+    ]), encoding='utf-8')
+    monkeypatch.setattr(import_users.Command, 'USERS_FILE', str(path))
+
+    def registered_meanwhile(path):
+        for item in iter_json_array(path):
+            if item['username'] == 'second':
+                django_user_model.objects.create_user(
+                    username='second', email='other@example.com')
+            yield item
+
+    monkeypatch.setattr(import_users, 'iter_json_array',
+                        registered_meanwhile)
+    out = StringIO()
+
+    call_command('import_users', batch_size=1, workers=1, stdout=out)
+
+    assert 'создано 1, обновлено 0, пропущено 1' in out.getvalue()
+    assert django_user_model.objects.get(
+        username='second').email == 'other@example.com'
+
+
+@pytest.mark.django_db
+def test_import_ingredients_hands_names_over(tmp_path):
+    first, second = Ingredient.objects.bulk_create([
+        Ingredient(name='соль', measurement_unit='г'),
+        Ingredient(name='перец', measurement_unit='г'),
+    ])
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'id': second.pk, 'name': 'сахар', 'measurement_unit': 'г'},
+        {'id': first.pk, 'name': 'перец', 'measurement_unit': 'г'},
+    ]), encoding='utf-8')
+
+    call_command('import_ingredients', file=str(path), stdout=StringIO())
+
+    assert dict(Ingredient.objects.values_list('id', 'name')) == {
+        first.pk: 'перец', second.pk: 'сахар'}
+
+
+@pytest.mark.django_db
+def test_import_recipes_names_broken_row(tmp_path, monkeypatch, author,
+                                         ingredients):
+    recipes = tmp_path / 'recipes.json'
+    recipes.write_text(json.dumps([
+        {'id': 1, 'author': author.pk, 'name': 'Рецепт',
+         'image': 'recipes/test.jpg', 'text': 'Описание',
+         'cooking_time': 10},
+    ]), encoding='utf-8')
+    links = tmp_path / 'recipe_ingredients.json'
+    links.write_text(json.dumps([
+        {'recipe': 1, 'ingredient': ingredients[0].pk, 'amount': 1},
+        {'recipe': 1, 'ingredient': ingredients[0].pk, 'amount': 2},
+    ]), encoding='utf-8')
+    command = import_recipes_data.Command
+    monkeypatch.setattr(command, 'RECIPES_FILE', str(recipes))
+    monkeypatch.setattr(command, 'RECIPE_INGREDIENTS_FILE', str(links))
+    monkeypatch.setattr(command, 'PHOTOS_SRC_DIR', str(tmp_path))
+    monkeypatch.setattr(command, 'PHOTOS_DST_DIR', str(tmp_path / 'media'))
+
+    with pytest.raises(CommandError, match=(
+            f'связь рецепт=1, ингредиент={ingredients[0].pk} нарушает')):
+        call_command('import_recipes_data', stdout=StringIO())
+
+    assert not Recipe.objects.exists()
@@ -0,0 +1,100 @@
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+def collect_pages(client, url):
+    """Follow ``next`` links and return the ids of all results."""
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert set(response.data) == {'next', 'results'}
+        ids += [item['id'] for item in response.data['results']]
+        url = response.data['next']
+    return ids
+
+
+def expected_ids():
+    return list(Recipe.objects.order_by('-pub_date', '-id')
+                .values_list('id', flat=True))
+
+
+def test_recipe_cursor_pages_break_ties_by_id(author, api_client,
+                                              make_recipes):
+    recipes = make_recipes(author, 9)
+    # Recipes published at the same moment are ordered by id.
+    Recipe.objects.filter(id__in=[recipe.id for recipe in recipes[:5]]
+                          ).update(pub_date=timezone.now())
+
+    ids = collect_pages(api_client,
+                        '/api/recipes/?pagination=cursor&limit=2')
+
+    assert ids == expected_ids()
+
+
+def test_new_recipes_do_not_shift_cursor_pages(author, api_client,
+                                               make_recipes):
+    make_recipes(author, 6)
+    first = api_client.get('/api/recipes/?pagination=cursor&limit=3').data
+    make_recipes(author, 2)
+
+    second = api_client.get(first['next']).data
+
+    assert ([item['id'] for item in first['results'] + second['results']]
+            == expected_ids()[2:])
+
+
+def test_feed_uses_the_same_keyset(user, author, user_client, make_recipes):
+    make_recipes(author, 7)
+    Follow.objects.create(user=user, following=author)
+
+    ids = collect_pages(user_client, '/api/recipes/feed/?limit=3')
+
+    assert ids == expected_ids()
+
+
+def test_user_cursor_pages(user, author, django_user_model, api_client):
+    for i in range(5):
+        django_user_model.objects.create_user(
+            username=f'user{i}', email=f'user{i}@example.com',
+            password='password')
+    # Djoser lists other users to staff only.
+    user.is_staff = True
+    user.save()
+    api_client.force_authenticate(user)
+
+    ids = collect_pages(api_client, '/api/users/?pagination=cursor&limit=2')
+
+    assert ids == list(django_user_model.objects.order_by('username')
+                       .values_list('id', flat=True))
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'WzFd', 'WyJ4IiwgMV0='])
+def test_invalid_cursor(api_client, cursor):
+    response = api_client.get(f'/api/recipes/?cursor={cursor}')
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('query', ['pagination=cursor', 'cursor=WzFd'])
+def test_search_with_cursor_rejected(author, api_client, make_recipes, query):
+    make_recipes(author, 2)
+
+    response = api_client.get(f'/api/recipes/?search=рецепт&{query}')
+
+    assert response.status_code == 400
+    assert 'cursor' in response.data
+
+
+def test_search_with_page_numbers(author, api_client, make_recipes):
+    make_recipes(author, 2)
+
+    response = api_client.get('/api/recipes/?search=рецепт&limit=1')
+
+    assert response.status_code == 200
+    assert response.data['count'] == 2
@@ -0,0 +1,69 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FavoriteRecipe, ShoppingList
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+# Count, recipe states, recipes missing from the cache with their
+# authors, and their ingredients.
+MAX_QUERIES = 4
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries), response.data
+
+
+def test_query_count_does_not_grow_with_page_size(
+        user, author, user_client, make_recipes,
+        django_assert_max_num_queries):
+    recipes = make_recipes(author, 12)
+    Follow.objects.create(user=user, following=author)
+    FavoriteRecipe.objects.create(user=user, recipe=recipes[0])
+
+    small, _ = count_queries(user_client, '/api/recipes/?limit=2')
+    large, data = count_queries(user_client, '/api/recipes/?limit=12')
+
+    assert len(data['results']) == 12
+    assert small == large
+    cache.clear()
+    with django_assert_max_num_queries(MAX_QUERIES):
+        user_client.get('/api/recipes/?limit=12')
+
+
+def test_flags_of_authenticated_user(user, author, user_client,
+                                     make_recipes):
+    favorited, in_cart, plain = make_recipes(author, 3)
+    Follow.objects.create(user=user, following=author)
+    FavoriteRecipe.objects.create(user=user, recipe=favorited)
+    ShoppingList.objects.create(user=user, recipe=in_cart)
+
+    _, data = count_queries(user_client, '/api/recipes/?limit=10')
+
+    results = {recipe['id']: recipe for recipe in data['results']}
+    assert all(recipe['author']['is_subscribed']
+               for recipe in results.values())
+    assert [results[recipe.id]['is_favorited']
+            for recipe in (favorited, in_cart, plain)] == [True, False, False]
+    assert [results[recipe.id]['is_in_shopping_cart']
+            for recipe in (favorited, in_cart, plain)] == [False, True, False]
+    assert all(len(recipe['ingredients']) == 5
+               for recipe in results.values())
+
+
+def test_flags_of_anonymous_user(user, author, api_client, make_recipes):
+    recipe, = make_recipes(author, 1)
+    FavoriteRecipe.objects.create(user=user, recipe=recipe)
+
+    _, data = count_queries(api_client, '/api/recipes/')
+
+    result, = data['results']
+    assert not result['is_favorited']
+    assert not result['author']['is_subscribed']
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection, transaction
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from search_vectors import CONFIG, DRIFT_SQL
+
+pytestmark = pytest.mark.django_db
+
+
+def drift():
+    with connection.cursor() as cursor:
+        cursor.execute(DRIFT_SQL)
+        return cursor.fetchone()[0]
+
+
+def found(query):
+    return list(Recipe.objects.filter(
+        search_vector=SearchQuery(query, config=CONFIG),
+    ).values_list('id', flat=True))
+
+
+def test_ingredient_changes(author, make_recipes):
+    recipe, = make_recipes(author, 1)
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    RecipeIngredient.objects.create(recipe=recipe, ingredient=salt, amount=5)
+    assert found('соль') == [recipe.pk]
+    Ingredient.objects.filter(pk=salt.pk).update(name='перец')
+    assert found('перец') == [recipe.pk]
+    RecipeIngredient.objects.filter(ingredient=salt).delete()
+    assert found('перец') == []
+    assert drift() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('rename_first', [False, True])
+def test_concurrent_ingredient_rename(author, make_recipes, rename_first):
+    """Each change is made in its own transaction while the other's is open."""
+    recipe, = make_recipes(author, 1)
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def rename():
+        Ingredient.objects.filter(pk=salt.pk).update(name='перец')
+
+    def add_ingredient():
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                        amount=5)
+
+    first, second = ((rename, add_ingredient) if rename_first
+                     else (add_ingredient, rename))
+    done = threading.Event()
+
+    def run_first():
+        try:
+            with transaction.atomic():
+                first()
+                done.set()
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    done.wait()
+    with transaction.atomic():
+        second()
+    thread.join()
+
+    assert found('перец') == [recipe.pk]
+    assert drift() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_ingredients_of_one_recipe(author, make_recipes):
+    recipe, = make_recipes(author, 1)
+    salt, pepper = Ingredient.objects.bulk_create([
+        Ingredient(name='соль', measurement_unit='г'),
+        Ingredient(name='перец', measurement_unit='г'),
+    ])
+    done = threading.Event()
+
+    def run_first():
+        try:
+            with transaction.atomic():
+                RecipeIngredient.objects.create(recipe=recipe,
+                                                ingredient=salt, amount=5)
+                done.set()
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    done.wait()
+    with transaction.atomic():
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=pepper,
+                                        amount=2)
+    thread.join()
+
+    assert found('соль') == found('перец') == [recipe.pk]
+    assert drift() == 0
@@ -0,0 +1,126 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import ShoppingList
+from tasks.models import Task
+from tasks.queue import (STALE_ERROR, TIMEOUT_ERROR, claim, delete_finished,
+                         enqueue, execute, heartbeat, requeue_stale, start)
+
+pytestmark = pytest.mark.django_db
+
+
+def expire_lease(task, seconds=120):
+    Task.objects.filter(pk=task.pk).update(
+        heartbeat_at=timezone.now() - timedelta(seconds=seconds))
+
+
+def test_renewed_task_is_not_requeued():
+    enqueue('tasks.tests.noop')
+    task, = claim(1)
+    expire_lease(task)
+
+    heartbeat([task])
+
+    assert requeue_stale(60) == 0
+    assert Task.objects.get(pk=task.pk).status == Task.RUNNING
+
+
+def test_stale_task_is_requeued():
+    enqueue('tasks.tests.noop')
+    task, = claim(1)
+    expire_lease(task)
+
+    assert requeue_stale(60) == 1
+    assert Task.objects.get(pk=task.pk).status == Task.PENDING
+
+
+def test_stale_task_out_of_attempts_fails():
+    enqueue('tasks.tests.noop', max_attempts=1)
+    task, = claim(1)
+    expire_lease(task)
+
+    assert requeue_stale(60) == 0
+    task.refresh_from_db()
+    assert task.status == Task.FAILED
+    assert task.error == STALE_ERROR
+    assert task.finished_at is not None
+
+
+@pytest.fixture
+def export(user, author, user_client, make_recipes):
+    recipe, = make_recipes(author, 1)
+    ShoppingList.objects.create(user=user, recipe=recipe)
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=csv&background=1')
+    assert response.status_code == 202
+    return execute(start(Task.objects.get(pk=response.data['id'])))
+
+
+def test_export_downloaded_by_owner(export, user_client):
+    result = user_client.get(f'/api/tasks/{export.pk}/').data['result']
+    assert 'path' not in result
+    assert result['url'].endswith(f'/api/tasks/{export.pk}/download/')
+
+    response = user_client.get(f'/api/tasks/{export.pk}/download/')
+
+    assert response.status_code == 200
+    assert 'attachment' in response['Content-Disposition']
+    assert 'продукт 0'.encode() in b''.join(response.streaming_content)
+
+
+def test_export_hidden_from_others(export, author, api_client):
+    assert not Path(settings.MEDIA_ROOT, export.result['path']).exists()
+    assert api_client.get(
+        f'/api/tasks/{export.pk}/download/').status_code == 401
+    client = APIClient()
+    client.force_authenticate(author)
+    assert client.get(f'/api/tasks/{export.pk}/download/').status_code == 404
+
+
+def test_old_tasks_deleted_with_exports(export,
+                                        django_capture_on_commit_callbacks):
+    path = Path(settings.EXPORTS_ROOT, export.result['path'])
+    assert path.exists()
+    recent = enqueue('tasks.tests.noop')
+    Task.objects.filter(pk=recent.pk).update(
+        status=Task.DONE, finished_at=timezone.now())
+    Task.objects.filter(pk=export.pk).update(
+        finished_at=timezone.now() - timedelta(days=8))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert delete_finished(7) == 1
+
+    assert not Task.objects.filter(pk=export.pk).exists()
+    assert Task.objects.filter(pk=recent.pk).exists()
+    assert not path.exists()
+
+
+def test_overdue_task_is_requeued():
+    enqueue('tasks.tests.noop', timeout=60)
+    task, = claim(1)
+    Task.objects.filter(pk=task.pk).update(
+        started_at=timezone.now() - timedelta(seconds=120))
+
+    heartbeat([task])
+
+    assert requeue_stale(60) == 1
+    task.refresh_from_db()
+    assert task.status == Task.PENDING
+    assert task.error == TIMEOUT_ERROR
+
+
+def test_result_of_expired_lease_is_dropped(user):
+    enqueue('api.tasks.build_feed_timeline', (user.pk,))
+    task, = claim(1)
+    expire_lease(task)
+    requeue_stale(60)
+
+    assert execute(task) is None
+    task.refresh_from_db()
+    assert task.status == Task.PENDING
+    assert task.finished_at is None
@@ -46,9 +46,12 @@ class UserAdmin(UserAdmin):
 
     fieldsets = UserAdmin.fieldsets + (
         ('Дополнительные поля', {
-            'fields': ('avatar',)
+            'fields': ('avatar', 'recipes_count', 'followers_count',
+                       'following_count')
         }),
     )
+    # Maintained by database triggers.
+    readonly_fields = ('recipes_count', 'followers_count', 'following_count')
 
     @admin.display(description='ФИО')
     def full_name(self, obj):
@@ -57,19 +60,20 @@ class UserAdmin(UserAdmin):
     @admin.display(description='Аватар')
     @mark_safe
     def avatar_tag(self, obj):
-        if obj.avatar:
-            return (f'<img src="{obj.avatar.url}" width="50" height="50" '
+        avatar = obj.avatar_thumbnail or obj.avatar
+        if avatar:
+            return (f'<img src="{avatar.url}" width="50" height="50" '
                     f'style="object-fit: cover; border-radius: 50%;" />')
         return '—'
 
-    @admin.display(description='Рецептов')
+    @admin.display(description='Рецептов', ordering='recipes_count')
     def recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Подписок')
+    @admin.display(description='Подписок', ordering='following_count')
     def following_count(self, obj):
-        return obj.follows.count()
+        return obj.following_count
 
-    @admin.display(description='Подписчиков')
+    @admin.display(description='Подписчиков', ordering='followers_count')
     def follows_count(self, obj):
-        return obj.authors.count()
+        return obj.followers_count
@@ -1,55 +1,146 @@
-import json
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
 from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from importing import batched, iter_json_array
 from users.models import User
 
+# A raw bcrypt hash as produced by the ``bcrypt`` library.
+BCRYPT_HASH = re.compile(r'^\$2[abxy]\$\d{2}\$[./A-Za-z0-9]{53}$')
+
+
+def stored_password(password):
+    """
+    Return ``password`` in Django's format if it is already a hash,
+    otherwise None.
+    """
+    if BCRYPT_HASH.match(password):
+        return f'bcrypt${password}'
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return None
+    return password
+
 
 class Command(BaseCommand):
     help = ('Импортирует пользователей из JSON файла '
             '(без передачи пути через командную строку)')
 
-    def handle(self, *args, **kwargs):
-        file_path = os.path.join('data', 'users_hashed.json')
+    USERS_FILE = os.path.join(settings.BASE_DIR, 'data', 'users_hashed.json')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество записей в одном INSERT')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Процессов для хеширования паролей, '
+                                 'заданных открытым текстом')
 
-        User.objects.all().delete()
-        self.stdout.write(self.style.WARNING('Все записи User '
-                                             'удалены перед импортом.'))
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # Existing users are updated rather than recreated, so their ids,
+        # recipes and subscriptions survive a repeated import.
+        existing = dict(User.objects.values_list('username', 'email'))
+        taken_emails = set(existing.values())
+        stats = {'created': 0, 'updated': 0, 'skipped': 0, 'hashed': 0}
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                users_data = json.load(f)
+            with transaction.atomic(), ProcessPoolExecutor(
+                max_workers=options['workers']
+            ) as executor:
+                for batch in batched(iter_json_array(self.USERS_FILE),
+                                     options['batch_size']):
+                    self.import_batch(batch, existing, taken_emails,
+                                      executor, stats)
         except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'Файл {file_path} не найден.'))
+            self.stdout.write(self.style.ERROR(
+                f'Файл {self.USERS_FILE} не найден.'))
             return
-        except json.JSONDecodeError:
-            self.stdout.write(self.style.ERROR('Ошибка при декодировании JSON файла.'))
+        except ValueError:
+            self.stdout.write(self.style.ERROR(
+                'Ошибка при декодировании JSON файла.'))
             return
 
-        for item in users_data:
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт пользователей завершён за {elapsed:.2f} с: '
+            f'создано {stats["created"]}, обновлено {stats["updated"]}, '
+            f'пропущено {stats["skipped"]}, '
+            f'захешировано паролей {stats["hashed"]}.'
+        ))
+
+    def import_batch(self, batch, existing, taken_emails, executor, stats):
+        new_users, plaintext, changed = [], [], []
+        for item in batch:
             email = item.get('email')
             username = item.get('username')
-            first_name = item.get('first_name', '')
-            last_name = item.get('last_name', '')
             password = item.get('password')
-
             if not (email and username and password):
                 self.stdout.write(self.style.WARNING(
-                    f'Пропущена запись с недостающими обязательными полями: {item}'))
+                    f'Пропущена запись с недостающими '
+                    f'обязательными полями: {item}'))
+                stats['skipped'] += 1
                 continue
 
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={
-                    'email': email,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                }
-            )
-            if created:
-                user.set_password(password)
-                user.save()
-                self.stdout.write(self.style.SUCCESS(f'Пользователь "{username}" успешно создан.'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Пользователь "{username}" уже существует.'))
-
-        self.stdout.write(self.style.SUCCESS('Импорт пользователей завершён.'))
+            user = User(username=username, email=email,
+                        first_name=item.get('first_name', ''),
+                        last_name=item.get('last_name', ''))
+            if username in existing:
+                # Passwords of existing users are left as they are.
+                if (email != existing[username]
+                        and email in taken_emails):
+                    user.email = existing[username]
+                changed.append(user)
+                continue
+            if email in taken_emails:
+                self.stdout.write(self.style.WARNING(
+                    f'Адрес {email} уже занят, пользователь '
+                    f'"{username}" пропущен.'))
+                stats['skipped'] += 1
+                continue
+
+            user.password = stored_password(password)
+            if user.password is None:
+                plaintext.append((user, password))
+            new_users.append(user)
+            existing[username] = email
+            taken_emails.add(email)
+
+        if plaintext:
+            hashes = executor.map(make_password,
+                                  [password for _, password in plaintext])
+            for (user, _), password_hash in zip(plaintext, hashes):
+                user.password = password_hash
+            stats['hashed'] += len(plaintext)
+
+        if new_users:
+            # Rows conflicting with users registered meanwhile are
+            # skipped, and ``ignore_conflicts`` does not tell which.
+            count = User.objects.count()
+            User.objects.bulk_create(new_users, ignore_conflicts=True)
+            created = User.objects.count() - count
+            stats['created'] += created
+            stats['skipped'] += len(new_users) - created
+        if changed:
+            stats['updated'] += self.update_users(changed)
+
+    @staticmethod
+    def update_users(users):
+        by_username = {user.username: user for user in users}
+        to_update = list(
+            User.objects.filter(username__in=by_username)
+            .only('id', 'username')
+        )
+        for user in to_update:
+            source = by_username[user.username]
+            user.email = source.email
+            user.first_name = source.first_name
+            user.last_name = source.last_name
+        return User.objects.bulk_update(
+            to_update, ['email', 'first_name', 'last_name'])
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+from counters import COUNTER_FUNCTION, counter_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_follow_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписок'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.RunSQL(
+            COUNTER_FUNCTION,
+            'DROP FUNCTION IF EXISTS foodgram_update_counter();',
+        ),
+        migrations.RunSQL(*counter_sql('users_follow', 'user_id',
+                                       'users_user', 'following_count')),
+        migrations.RunSQL(*counter_sql('users_follow', 'following_id',
+                                       'users_user', 'followers_count')),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/thumbs/', verbose_name='Миниатюра аватара'),
+        ),
+    ]
@@ -4,11 +4,14 @@ from django.core.validators import RegexValidator
 
 from constants import (MAX_NAME_LEN, MAX_SURNAME_LEN,
                            MAX_USERNAME_LEN, MAX_EMAIL_LEN)
+from counters import TriggerFieldsMixin
 
 
-class User(AbstractUser):
+class User(TriggerFieldsMixin, AbstractUser):
     """Custom user model."""
 
+    trigger_fields = ('recipes_count', 'followers_count', 'following_count')
+
     first_name = models.CharField(
         'Имя',
         max_length=MAX_NAME_LEN
@@ -38,6 +41,19 @@ class User(AbstractUser):
 
     avatar = models.ImageField(
         upload_to='users/', null=True, blank=True)
+    # Generated from ``avatar``, see ``images.update_thumbnail``.
+    avatar_thumbnail = models.ImageField(
+        'Миниатюра аватара', upload_to='users/thumbs/', blank=True,
+        editable=False)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    # Maintained by database triggers, see the counters migrations.
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False)
+    following_count = models.PositiveIntegerField(
+        'Подписок', default=0, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]